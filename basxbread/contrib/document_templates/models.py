@@ -1,17 +1,22 @@
+import collections
+import copy
 import io
+import multiprocessing
 import os
 import shutil
 import subprocess  # nosec
 import tempfile
-from typing import Union
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
 from zipfile import ZipFile
 
 import docx
 import htmlgenerator as hg
 from defusedxml.ElementTree import parse
 from django import forms
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import connections, models
 from django.utils import formats
 from django.utils.dateformat import DateFormat
 from django.utils.timezone import now
@@ -22,6 +27,98 @@ from jinja2.sandbox import SandboxedEnvironment
 
 from basxbread import utils
 
+# number of processes to render many documents, 1 renders in the current process
+DOCUMENT_TEMPLATE_PROCESSES = getattr(settings, "DOCUMENT_TEMPLATE_PROCESSES", 1)
+
+FOOTNOTES_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"
+)
+
+
+class DocumentEnvironment(SandboxedEnvironment):
+    """Environment for docxtpl which uses the shared cache of compiled templates"""
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals is not None or template_class is not None:
+            return utils.jinja_env().from_string(source, globals, template_class)
+        # the xml parts of a document are usually longer than the cache limit
+        return utils.jinja_template(source, cache_large=True)
+
+
+class _DocxTemplate(DocxTemplate):
+    """DocxTemplate which prepares the xml of each part for jinja only once"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.patched = {}
+
+    def patch_xml(self, src_xml):
+        if src_xml not in self.patched:
+            self.patched[src_xml] = super().patch_xml(src_xml)
+        return self.patched[src_xml]
+
+
+class DocumentRenderer:
+    """
+    Renders documents from the content of a docx template. The file is parsed
+    only once and the jinja templates of the document are compiled only once.
+    Each rendering starts from a copy of the parts which docxtpl replaces.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.env = DocumentEnvironment()
+        self.template = _DocxTemplate(io.BytesIO(content))
+        self.template.init_docx()
+        document = self.template.docx
+        self.body = copy.deepcopy(document.element.body)
+        self.targets = {key: rel._target for key, rel in document.part.rels.items()}
+        self.coreproperties = copy.deepcopy(
+            document.part.package._core_properties_part.element
+        )
+        self.blobs = {
+            part: part.blob
+            for part in document.part.package.parts
+            if part.content_type == FOOTNOTES_CONTENT_TYPE
+        }
+
+    def render(self, context) -> bytes:
+        document = self.template.docx
+        document.element.replace(document.element.body, copy.deepcopy(self.body))
+        for key, target in self.targets.items():
+            document.part.rels[key]._target = target
+        document.part.package._core_properties_part._element = copy.deepcopy(
+            self.coreproperties
+        )
+        for part, blob in self.blobs.items():
+            part._blob = blob
+        self.template.is_rendered = False  # prevents reloading the file
+        self.template.render(context, self.env)
+        buf = io.BytesIO()
+        self.template.save(buf)
+        return buf.getvalue()
+
+
+# the renderer of a worker process in DocumentTemplate.generate_documents
+_worker_renderer: Optional[DocumentRenderer] = None
+# the database connections which a worker process inherited from its parent
+_parent_connections: list = []
+
+
+def _init_worker(content):
+    global _worker_renderer
+    # The forked worker shares the sockets of the database connections with
+    # the parent process. They are closed for the worker without being
+    # finalized, which would end the database sessions of the parent, too.
+    for connection in connections.all(initialized_only=True):
+        _parent_connections.append(connection.connection)
+        connection.connection = None
+    _worker_renderer = DocumentRenderer(content)
+
+
+def _render_in_worker(context):
+    return _worker_renderer.render(context)
+
 
 class DocumentTemplate(models.Model):
     name = models.CharField(_("Name"), max_length=255)
@@ -50,9 +147,9 @@ class DocumentTemplate(models.Model):
     def default_context(self):
         return {"now": DateFormat(now())}
 
-    def context(self, object):
+    def context(self, object, variables=None):
         context = {}
-        for variable in self.variables.all():
+        for variable in self.variables.all() if variables is None else variables:
             context[variable.name] = hg.resolve_lookup(object, variable.value)
             if context[variable.name] is None:
                 context[variable.name] = ""
@@ -72,39 +169,78 @@ class DocumentTemplate(models.Model):
         context.update(self.default_context())
         return context
 
-    def render_with(self, object):
-        docxtpl_template = DocxTemplate(self.file.path)
-        env = SandboxedEnvironment()
-        env.filters["map"] = lambda value, map: map.get(value, value)
-        docxtpl_template.render(self.context(object), env)
+    def renderer(self):
+        with self.file.open("rb") as f:
+            return DocumentRenderer(f.read())
 
-        buf = io.BytesIO()
-        docxtpl_template.save(buf)
-        buf.seek(0)
-        return buf
+    def render_with(self, object):
+        return io.BytesIO(self.renderer().render(self.context(object)))
 
-    def generate_document(self, object, extension):
+    def filename(self, object, extension):
         filename = f'{self.name}_{str(object).replace(" ", "-")}'
         if self.filename_template:
             try:
-                filename = (
-                    utils.jinja_env()
-                    .from_string(self.filename_template)
-                    .render(
-                        **{attr: getattr(object, attr, "") for attr in dir(object)},
-                        **self.default_context(),
-                    )
+                # object attributes may be named "template", so no jinja_render
+                filename = utils.jinja_template(self.filename_template).render(
+                    **{attr: getattr(object, attr, "") for attr in dir(object)},
+                    **self.default_context(),
                 )
             except Exception as e:
                 print(e)
                 filename = f"FILENAME_ERROR.{extension}"
         if not filename.endswith("." + extension):
             filename = f"{filename}.{extension}"
+        return filename
+
+    def generate_document(self, object, extension):
+        return self.filename(object, extension), self.render_with(object)
 
-        return (
-            filename,
-            self.render_with(object),
+    def generate_documents(self, objects, processes=None):
+        """
+        Yields (filename, content) of a docx document for each object, in the
+        same order. The template is read and compiled once and the contexts are
+        built in this process. With more than one process (see the setting
+        DOCUMENT_TEMPLATE_PROCESSES) the documents are rendered in a pool of
+        forked processes.
+        """
+        processes = DOCUMENT_TEMPLATE_PROCESSES if processes is None else processes
+        renderer = self.renderer()
+        variables = list(self.variables.all())
+        jobs = (
+            (self.filename(object, "docx"), self.context(object, variables))
+            for object in objects
         )
+        if processes <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+            for filename, context in jobs:
+                yield filename, renderer.render(context)
+            return
+
+        # the workers are forked, so they do not need to set up django
+        with ProcessPoolExecutor(
+            processes,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(renderer.content,),
+        ) as executor:
+            pending: collections.deque = collections.deque()
+
+            def result(filename, context, future):
+                try:
+                    return filename, future.result()
+                except Exception:
+                    # e.g. the context could not be pickled, the error will be
+                    # raised again here if the rendering itself failed
+                    return filename, renderer.render(context)
+
+            for filename, context in jobs:
+                pending.append(
+                    (filename, context, executor.submit(_render_in_worker, context))
+                )
+                # limit the number of finished documents which are kept in memory
+                if len(pending) > processes * 4:
+                    yield result(*pending.popleft())
+            while pending:
+                yield result(*pending.popleft())
 
     def generate_document_pdf(self, object):
         filename, content = self.generate_document(object, "pdf")
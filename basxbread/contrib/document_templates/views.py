@@ -1,5 +1,11 @@
+import io
+import os
+import zipfile
+
 import htmlgenerator as hg
-from django.http import HttpResponse
+from django.contrib import messages
+from django.contrib.contenttypes.models import ContentType
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 
@@ -137,3 +143,78 @@ def generate_document_download_pdf(request, pk: int, object_pk: int):
     response = HttpResponse(content, content_type="application/pdf")
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Collects the data written by a ZipFile until it is sent to the client"""
+
+    def __init__(self):
+        self.data = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data.append(bytes(b))
+        return len(b)
+
+    def pop(self):
+        ret = b"".join(self.data)
+        self.data = []
+        return ret
+
+
+def stream_zip(files):
+    """Generates a ZIP archive of the (filename, content) pairs chunk by chunk"""
+    buffer = _StreamBuffer()
+    names = set()
+    # docx files are already compressed
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for filename, content in files:
+            name, extension = os.path.splitext(filename)
+            i = 1
+            while filename in names:
+                i += 1
+                filename = f"{name}_{i}{extension}"
+            names.add(filename)
+            archive.writestr(filename, content)
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+def generate_documents(request, queryset, template=None):
+    """
+    Bulk action which downloads a ZIP file with a docx document for each
+    object. The template is the one passed, the one selected with the URL
+    parameter "document_template" or the only template for the model.
+    """
+    if template is None:
+        templates = DocumentTemplate.objects.filter(
+            model=ContentType.objects.get_for_model(queryset.model)
+        )
+        if "document_template" in request.GET:
+            if not request.GET["document_template"].isdigit():
+                templates = templates.none()
+            else:
+                templates = templates.filter(pk=request.GET["document_template"])
+        if templates.count() != 1:
+            messages.error(request, _("Please select a single document template"))
+            return None
+        template = templates.get()
+
+    response = StreamingHttpResponse(
+        stream_zip(template.generate_documents(queryset.iterator())),
+        content_type="application/zip",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{template.name}.zip"'
+    return response
+
+
+def generate_documents_bulkaction(template=None):
+    """BulkAction for BrowseView which generates documents for the selected objects"""
+    return views.browse.BulkAction(
+        "generate_documents",
+        label=template.name if template else _("Generate documents"),
+        iconname="document",
+        action=lambda request, qs: generate_documents(request, qs, template),
+    )
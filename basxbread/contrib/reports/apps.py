@@ -1,8 +1,27 @@
+import datetime
+
+from celery import shared_task
 from django.apps import AppConfig
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
+REPORT_SNAPSHOT_PERIOD = getattr(
+    settings, "REPORT_SNAPSHOT_PERIOD", datetime.timedelta(hours=1)
+)
+
 
 class ReportsConfig(AppConfig):
     name = "basxbread.contrib.reports"
     default_auto_field = "django.db.models.BigAutoField"
     verbose_name = _("Reports")
+
+    def ready(self):
+        from basxbread.utils.celery import RepeatedTask
+
+        from .tasks import refresh_report_snapshots
+
+        shared_task(
+            base=RepeatedTask,
+            run_every=REPORT_SNAPSHOT_PERIOD,
+            name="basxbread.contrib.reports.tasks.refresh_report_snapshots",
+        )(refresh_report_snapshots)
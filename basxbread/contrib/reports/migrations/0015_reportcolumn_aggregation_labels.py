@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0014_remove_reportcolumn_sortingname"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="reportcolumn",
+            name="aggregation",
+            field=models.CharField(
+                blank=True,
+                choices=[("count", "Count"), ("sum", "Sum")],
+                max_length=64,
+                verbose_name="Aggregation",
+            ),
+        ),
+    ]
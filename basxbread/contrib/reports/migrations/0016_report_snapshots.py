@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0015_reportcolumn_aggregation_labels"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="report",
+            name="use_snapshot",
+            field=models.BooleanField(
+                default=False,
+                help_text="Display and export the report from a snapshot which is refreshed periodically, instead of evaluating the filter every time",
+                verbose_name="Use snapshot",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ReportSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("refreshed", models.DateTimeField(verbose_name="Last refreshed")),
+                ("headers", models.JSONField(verbose_name="Headers")),
+                ("totals", models.JSONField(null=True, verbose_name="Totals")),
+                (
+                    "report",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshot",
+                        to="reports.report",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Report snapshot",
+                "verbose_name_plural": "Report snapshots",
+            },
+        ),
+        migrations.CreateModel(
+            name="ReportSnapshotRow",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cells", models.JSONField()),
+                (
+                    "snapshot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rows",
+                        to="reports.reportsnapshot",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+    ]
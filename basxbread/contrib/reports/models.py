@@ -1,14 +1,32 @@
+import hashlib
+import itertools
+import json
+import typing
+
 import htmlgenerator as hg
 from django import forms
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models, transaction
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from basxbread import layout, utils
+from basxbread import formatters, layout, utils
 from basxbread.querysetfield import QuerysetField, parsequeryexpression
 
-from ...layout.components.datatable import DataTableColumn
+# the preview in the edit view shows REPORT_PREVIEW_ROWS rows, queries are aborted
+# after REPORT_PREVIEW_TIMEOUT seconds and the result is cached for
+# REPORT_PREVIEW_CACHE_TIMEOUT seconds
+REPORT_PREVIEW_ROWS = getattr(settings, "REPORT_PREVIEW_ROWS", 10)
+REPORT_PREVIEW_TIMEOUT = getattr(settings, "REPORT_PREVIEW_TIMEOUT", 5)
+REPORT_PREVIEW_CACHE_TIMEOUT = getattr(settings, "REPORT_PREVIEW_CACHE_TIMEOUT", 300)
+
+
+# fields which can be summed up in the report totals
+NUMERIC_FIELDS = (models.IntegerField, models.FloatField, models.DecimalField)
 
 
 def available_report_filters(modelfield, request, report):
@@ -44,28 +62,46 @@ class Report(models.Model):
             "report in the browser, 0 for everything on one page"
         ),
     )
+    use_snapshot = models.BooleanField(
+        _("Use snapshot"),
+        default=False,
+        help_text=_(
+            "Display and export the report from a snapshot which is refreshed "
+            "periodically, instead of evaluating the filter every time"
+        ),
+    )
 
-    @property
-    def preview(self):
-        columns = []
-        for column in self.columns.all():
-            columns.append(
-                DataTableColumn(
-                    header=column.header,
-                    cell=column.render_element("row"),
-                )
-            )
-        qs = self.queryset
-        if qs is None:
-            return hg.BaseElement("Model does no longer exists!")
-
-        return layout.datatable.DataTable.from_queryset(
-            title=_("Preview"),
-            helper_text="",
-            queryset=qs[:10],
-            columns=columns,
-            primary_button="",
-        )
+    def preview(self, limit=REPORT_PREVIEW_ROWS, timeout=REPORT_PREVIEW_TIMEOUT):
+        """
+        Returns the headers and the rendered cells of the first rows. Queries
+        are aborted after timeout seconds (if the database supports it).
+        The cells are cached until the filter or the column definitions change,
+        changing only the headers does not run the query again.
+        """
+        reportcolumns = list(self.columns.all())
+        elements = self.cell_elements(reportcolumns)
+        key = hashlib.md5(
+            json.dumps(
+                [
+                    self.model_id,
+                    self.filter.raw,
+                    self.custom_queryset,
+                    limit,
+                    [(c.column, c.cell_template, c.allow_html) for c in reportcolumns],
+                ]
+            ).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        key = f"basxbread-report-preview-{self.pk}-{key}"
+        rows = cache.get(key)
+        if rows is None:
+            with utils.statement_timeout(timeout):
+                rows = [
+                    [hg.render(element, {"row": row}) for element in elements.values()]
+                    for row in self.queryset[:limit]
+                ]
+            cache.set(key, rows, REPORT_PREVIEW_CACHE_TIMEOUT)
+        return [str(header) for header in elements], rows
 
     @property
     def queryset(self):
@@ -97,6 +133,85 @@ class Report(models.Model):
             return parsequeryexpression(ret, self.filter.raw).queryset
         return self.filter.queryset
 
+    def aggregate(self, queryset, columns):
+        """
+        Returns the aggregated values for the columns or None if no column has an
+        aggregation. Columns without aggregation have the value None.
+        All values are computed with a single query, except for columns which
+        span multi-valued relationships: They would multiply the joined rows for
+        the other aggregates and get a query each.
+        """
+        model = self.model.model_class()
+        groups: typing.List[dict] = [{}]
+        for i, column in enumerate(columns):
+            expression = column.aggregate_expression(model)
+            if expression is None:
+                continue
+            if column.is_multivalued(model):
+                groups.append({f"column{i}": expression})
+            else:
+                groups[0][f"column{i}"] = expression
+        values = {}
+        for expressions in groups:
+            if expressions:
+                values.update(queryset.order_by().aggregate(**expressions))
+        if not values:
+            return None
+        return [values.get(f"column{i}") for i in range(len(columns))]
+
+    def cell_elements(self, reportcolumns):
+        """Returns a dict with {<header>: element} to render a row with name 'row'"""
+        if reportcolumns:
+            return {
+                column.header: column.render_element("row") for column in reportcolumns
+            }
+        return {
+            column: hg.F(
+                lambda c, column=column: formatters.format_value(
+                    hg.resolve_lookup(c["row"], column)
+                )
+            )
+            for column in utils.filter_fieldlist(self.model.model_class(), ["__all__"])
+        }
+
+    def refresh_snapshot(self, chunk_size=1000):
+        """Evaluates the report and stores the rendered rows as snapshot"""
+        reportcolumns = list(self.columns.all())
+        elements = self.cell_elements(reportcolumns)
+        queryset = self.queryset
+        totals = self.aggregate(queryset, reportcolumns)
+        if totals is not None:
+            totals = [
+                (
+                    hg.render(hg.BaseElement(formatters.format_value(value)), {})
+                    if column.aggregation
+                    else ""
+                )
+                for column, value in zip(reportcolumns, totals)
+            ]
+        rows = (
+            [hg.render(element, {"row": row}) for element in elements.values()]
+            for row in queryset.iterator(chunk_size=chunk_size)
+        )
+        with transaction.atomic():
+            snapshot, created = ReportSnapshot.objects.update_or_create(
+                report=self,
+                defaults={
+                    "refreshed": timezone.now(),
+                    "headers": [str(header) for header in elements],
+                    "totals": totals,
+                },
+            )
+            snapshot.rows.all().delete()
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+                ReportSnapshotRow.objects.bulk_create(
+                    ReportSnapshotRow(snapshot=snapshot, cells=cells) for cells in chunk
+                )
+        return snapshot
+
     def __str__(self):
         return self.name
 
@@ -108,8 +223,8 @@ class Report(models.Model):
 
 class ReportColumn(models.Model):
     AGGREGATIONS = {
-        "count": "",
-        "sum": "",
+        "count": _("Count"),
+        "sum": _("Sum"),
     }
     report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name="columns")
     header = models.CharField(_("Header"), max_length=255)
@@ -157,7 +272,76 @@ class ReportColumn(models.Model):
 
         return hg.BaseElement(layout.ObjectFieldValue(self.column, rowvariable))
 
+    def lookup_fields(self, model):
+        """The fields of the column lookup or None if it is not a database lookup"""
+        try:
+            fields = utils.resolve_modellookup(model, self.column)
+        except (AttributeError, FieldDoesNotExist):
+            return None
+        if not all(
+            isinstance(f, (models.Field, models.ForeignObjectRel)) for f in fields
+        ):
+            return None
+        return fields
+
+    def aggregate_expression(self, model):
+        """
+        The ORM aggregate for this column or None if the column has no database
+        lookup, sums are only computed for numeric fields
+        """
+        if self.aggregation not in self.AGGREGATIONS:
+            return None
+        fields = self.lookup_fields(model)
+        if fields is None:
+            return None
+        if self.aggregation == "sum" and not isinstance(fields[-1], NUMERIC_FIELDS):
+            return None
+        lookup = LOOKUP_SEP.join(f.name for f in fields)
+        return {"count": models.Count, "sum": models.Sum}[self.aggregation](lookup)
+
+    def clean(self):
+        if self.aggregation == "sum" and self.report_id is not None:
+            fields = self.lookup_fields(self.report.model.model_class())
+            if fields is None or not isinstance(fields[-1], NUMERIC_FIELDS):
+                raise ValidationError(
+                    {"aggregation": _("Only columns with numbers can be summed up")}
+                )
+
+    def is_multivalued(self, model):
+        return any(
+            getattr(f, "many_to_many", False) or getattr(f, "one_to_many", False)
+            for f in utils.resolve_modellookup(model, self.column)
+        )
+
     class Meta:
         verbose_name = _("Column")
         verbose_name_plural = _("Columns")
         order_with_respect_to = "report"
+
+
+class ReportSnapshot(models.Model):
+    report = models.OneToOneField(
+        Report, on_delete=models.CASCADE, related_name="snapshot"
+    )
+    refreshed = models.DateTimeField(_("Last refreshed"))
+    headers = models.JSONField(_("Headers"))
+    totals = models.JSONField(_("Totals"), null=True)
+
+    def __str__(self):
+        return f"{self.report} ({self.refreshed})"
+
+    class Meta:
+        verbose_name = _("Report snapshot")
+        verbose_name_plural = _("Report snapshots")
+
+
+class ReportSnapshotRow(models.Model):
+    """One row of a snapshot with the rendered HTML of each cell"""
+
+    snapshot = models.ForeignKey(
+        ReportSnapshot, on_delete=models.CASCADE, related_name="rows"
+    )
+    cells = models.JSONField()
+
+    class Meta:
+        ordering = ["id"]
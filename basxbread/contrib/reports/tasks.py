@@ -0,0 +1,15 @@
+from celery import shared_task
+
+
+@shared_task
+def refresh_report_snapshot(report_pk):
+    from .models import Report
+
+    Report.objects.get(pk=report_pk).refresh_snapshot()
+
+
+def refresh_report_snapshots():
+    from .models import Report
+
+    for report in Report.objects.filter(use_snapshot=True):
+        report.refresh_snapshot()
@@ -10,7 +10,7 @@ from basxbread.views.browse import delete
 from basxbread.views.edit import bulkcopy, generate_copyview
 
 from .models import Report
-from .views import EditView, ReadView, exceldownload
+from .views import EditView, ReadView, exceldownload, preview, refreshsnapshot
 
 urlpatterns = [
     *urls.default_model_paths(
@@ -60,6 +60,21 @@ urlpatterns = [
         exceldownload,
         urls.model_urlname(Report, "excel"),
     ),
+    urls.autopath(
+        preview,
+        urls.model_urlname(Report, "preview"),
+        check_function=lambda user: user.has_perm(
+            f"{Report._meta.app_label}.view_{Report._meta.model_name}"
+        )
+        or user.has_perm(f"{Report._meta.app_label}.change_{Report._meta.model_name}"),
+    ),
+    urls.autopath(
+        refreshsnapshot,
+        urls.model_urlname(Report, "refreshsnapshot"),
+        check_function=lambda user: user.has_perm(
+            f"{Report._meta.app_label}.change_{Report._meta.model_name}"
+        ),
+    ),
     path(
         "reporthelp/",
         TemplateView.as_view(template_name="djangoql/syntax_help.html"),
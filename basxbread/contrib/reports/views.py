@@ -1,17 +1,34 @@
 import datetime
 
 import htmlgenerator as hg
+from django.conf import settings
+from django.contrib import messages
+from django.core.exceptions import FieldError
 from django.core.paginator import Paginator
-from django.db import models
-from django.http import HttpResponseNotFound
-from django.shortcuts import get_object_or_404
+from django.http import HttpResponseNotAllowed, HttpResponseNotFound
+from django.shortcuts import get_object_or_404, redirect
+from django.utils import formats, timezone
 from django.utils.translation import gettext_lazy as _
 
-from basxbread import formatters, layout, views
-from basxbread.utils import filter_fieldlist, generate_excel, xlsxresponse
+from basxbread import formatters, layout, utils, views
+from basxbread.utils import (
+    excel_cellvalue,
+    filter_fieldlist,
+    generate_excel,
+    related_lookups,
+    xlsxresponse,
+)
 from basxbread.utils.links import ModelHref
+from basxbread.utils.urls import link_with_urlparameters, reverse_model
+from basxbread.views.browse import order_queryset_by_urlparameter
 
-from .models import Report
+from .models import Report, ReportSnapshot
+from .tasks import refresh_report_snapshot
+
+# reports without pagination are loaded in steps of REPORT_ROWS_STEP rows, up to
+# REPORT_MAX_ROWS rows, so that huge reports cannot overload the server
+REPORT_ROWS_STEP = getattr(settings, "REPORT_ROWS_STEP", 1000)
+REPORT_MAX_ROWS = getattr(settings, "REPORT_MAX_ROWS", 10000)
 
 
 class EditView(views.EditView):
@@ -33,7 +50,7 @@ class EditView(views.EditView):
             hg.C("form")["columns"].formset,
             fieldname="columns",
             title=hg.C("form")["columns"].label,
-            fields=["header", "column", "cell_template", "allow_html"],
+            fields=["header", "column", "cell_template", "allow_html", "aggregation"],
             formsetfield_kwargs={
                 "extra": 1,
                 "can_order": True,
@@ -68,12 +85,22 @@ class EditView(views.EditView):
                     hg.DIV(
                         F("custom_queryset"),
                         F("pagination"),
+                        F("use_snapshot"),
                     ),
                 ),
                 layout.forms.helpers.Submit(style="margin-top: 1rem"),
                 column_helper,
             ),
-            hg.C("object.preview"),
+            hg.DIV(
+                layout.loading.Loading(small=True),
+                hx_get=hg.format(
+                    "{}?{}",
+                    ModelHref(hg.C("object"), "preview"),
+                    settings.AJAX_URLPARAMETER,
+                ),
+                hx_trigger="load",
+                hx_swap="outerHTML",
+            ),
         )
         return ret
 
@@ -83,34 +110,22 @@ class EditView(views.EditView):
 
 class ReadView(views.ReadView):
     def get_layout(self):
-        # ordering, copied from basxbread.views.browse.BrowseView.get_queryset
         if self.object.model.model_class() is None:
             return layout.notification.InlineNotification(
                 "Error",
                 f"Model '{self.object.model}' does no longer exist.",
                 kind="error",
             )
+        if self.object.use_snapshot:
+            return self.get_snapshot_layout()
 
-        qs = self.object.queryset
-        order = self.request.GET.get("ordering")
-        if order:
-            if order.endswith("__int"):
-                order = order[: -len("__int")]
-                qs = qs.order_by(
-                    models.functions.Cast(order[1:], models.IntegerField()).desc()
-                    if order.startswith("-")
-                    else models.functions.Cast(order, models.IntegerField())
-                )
-            else:
-                qs = qs.order_by(
-                    models.functions.Lower(order[1:]).desc()
-                    if order.startswith("-")
-                    else models.functions.Lower(order)
-                )
-        paginator = Paginator(qs, self.object.pagination)
+        reportcolumns = list(self.object.columns.all())
+        qs = self.get_queryset_for_report(reportcolumns)
+        paginator = Paginator(qs, self.object.pagination or REPORT_ROWS_STEP)
+        limit = self.get_limit()
 
         columns = []
-        for col in self.object.columns.all():
+        for col in reportcolumns:
             sortingname = None
             try:
                 sortingname = layout.datatable.sortingname_for_column(
@@ -148,30 +163,221 @@ class ReadView(views.ReadView):
                         self.request.GET.get(pagination_config.page_urlparameter)
                     )
                     if self.object.pagination
-                    else qs
+                    else qs[:limit]
                 ),
+                footer=aggregation_footer(self.object, qs, reportcolumns),
             ).with_toolbar(
                 title=self.object.name,
-                helper_text=f"{self.object.queryset.count()} "
+                helper_text=f"{paginator.count} "
                 f"{self.object.model.model_class()._meta.verbose_name_plural}",
                 primary_button=layout.button.Button(
                     label=_("Excel"), icon="download"
                 ).as_href(ModelHref(self.object, "excel")),
                 pagination_config=pagination_config if self.object.pagination else None,
             ),
+            self.load_more(paginator.count, limit) if limit is not None else None,
+        )
+
+    def get_queryset_for_report(self, reportcolumns):
+        """The report queryset with the ordering from the URL and related objects"""
+        qs = self.object.queryset
+        try:
+            qs = order_queryset_by_urlparameter(qs, self.request.GET.get("ordering"))
+        except (KeyError, FieldError):
+            pass  # ignore invalid orderings
+        # a unique ordering is required for stable pages
+        ordering = qs.query.order_by or (
+            qs.model._meta.ordering if qs.query.default_ordering else ()
+        )
+        qs = qs.order_by(*ordering, "pk")
+        select_related, prefetch_related = related_lookups(
+            qs.model, [column.column for column in reportcolumns]
+        )
+        if select_related:
+            qs = qs.select_related(*select_related)
+        if prefetch_related:
+            qs = qs.prefetch_related(*prefetch_related)
+        return qs
+
+    def get_limit(self):
+        """The number of rows to show for reports without pagination"""
+        if self.object.pagination:
+            return None
+        try:
+            limit = int(self.request.GET.get("limit", REPORT_ROWS_STEP))
+        except ValueError:
+            limit = REPORT_ROWS_STEP
+        return min(max(limit, 1), REPORT_MAX_ROWS)
+
+    def load_more(self, count, limit):
+        """
+        Reports without pagination show at most REPORT_MAX_ROWS rows, starting
+        with REPORT_ROWS_STEP rows and a button to load more.
+        """
+        if count <= limit:
+            return None
+        if limit >= REPORT_MAX_ROWS:
+            return layout.notification.InlineNotification(
+                _("Incomplete"),
+                _(
+                    "Only the first %(limit)s rows are shown, "
+                    "use the Excel export to get all rows."
+                )
+                % {"limit": limit},
+                kind="info",
+                lowcontrast=True,
+            )
+        return layout.button.Button(
+            _("Load more"), buttontype="ghost", icon="add", style="margin-top: 1rem"
+        ).as_href(
+            link_with_urlparameters(
+                self.request, limit=min(limit + REPORT_ROWS_STEP, REPORT_MAX_ROWS)
+            )
+        )
+
+    def get_snapshot_layout(self):
+        snapshot = ReportSnapshot.objects.filter(report=self.object).first()
+        refreshbutton = hg.FORM(
+            layout.forms.CsrfToken(),
+            layout.button.Button(
+                _("Refresh snapshot"), type="submit", buttontype="ghost", icon="renew"
+            ),
+            method="POST",
+            action=ModelHref(self.object, "refreshsnapshot"),
+        )
+        if snapshot is None:
+            return hg.BaseElement(
+                views.header(),
+                layout.notification.InlineNotification(
+                    _("No snapshot"),
+                    _("The snapshot of this report has not been created yet."),
+                    kind="info",
+                ),
+                refreshbutton,
+            )
+
+        rows = snapshot.rows.all()
+        paginator = Paginator(rows, self.object.pagination or REPORT_ROWS_STEP)
+        limit = self.get_limit()
+        pagination_config = layout.pagination.PaginationConfig(
+            paginator=paginator,
+            items_per_page_options=[self.object.pagination],
+        )
+        return hg.BaseElement(
+            views.header(),
+            layout.datatable.DataTable(
+                columns=[
+                    layout.datatable.DataTableColumn(
+                        header=header,
+                        cell=hg.F(lambda c, i=i: hg.mark_safe(c["row"].cells[i])),
+                    )
+                    for i, header in enumerate(snapshot.headers)
+                ],
+                row_iterator=(
+                    paginator.get_page(
+                        self.request.GET.get(pagination_config.page_urlparameter)
+                    )
+                    if self.object.pagination
+                    else rows[:limit]
+                ),
+                footer=(
+                    [hg.mark_safe(total) for total in snapshot.totals]
+                    if snapshot.totals is not None
+                    else None
+                ),
+            ).with_toolbar(
+                title=self.object.name,
+                helper_text=_("%(count)s %(model)s, last refreshed %(refreshed)s")
+                % {
+                    "count": paginator.count,
+                    "model": self.object.model.model_class()._meta.verbose_name_plural,
+                    "refreshed": formats.localize(
+                        timezone.localtime(snapshot.refreshed)
+                    ),
+                },
+                primary_button=layout.button.Button(
+                    label=_("Excel"), icon="download"
+                ).as_href(ModelHref(self.object, "excel")),
+                pagination_config=pagination_config if self.object.pagination else None,
+            ),
+            self.load_more(paginator.count, limit) if limit is not None else None,
+            refreshbutton,
         )
 
 
+@utils.aslayout
+def preview(request, pk: int):
+    """The first rows of a report, loaded lazily in the edit view"""
+    report = get_object_or_404(Report, pk=pk)
+    if report.model.model_class() is None:
+        return hg.BaseElement(_("Model does no longer exists!"))
+    try:
+        headers, rows = report.preview()
+    except Exception as e:
+        return layout.notification.InlineNotification(
+            _("Preview failed"), str(e), kind="error", lowcontrast=True
+        )
+    return layout.datatable.DataTable(
+        columns=[
+            layout.datatable.DataTableColumn(
+                header=header,
+                cell=previewcell(i),
+            )
+            for i, header in enumerate(headers)
+        ],
+        row_iterator=rows,
+    ).with_toolbar(title=_("Preview"), helper_text="")
+
+
+def previewcell(index: int) -> hg.F:
+    """The pre-rendered value at the given index of a preview row"""
+    return hg.F(lambda c: hg.mark_safe(c["row"][index]))
+
+
+def refreshsnapshot(request, pk: int):
+    """Starts the refresh of the snapshot of a report in the background"""
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    report = get_object_or_404(Report, pk=pk)
+    refresh_report_snapshot.apply_async((report.pk,))
+    messages.info(
+        request,
+        _("The snapshot is being refreshed, reload the page in a moment."),
+    )
+    return redirect(reverse_model(Report, "read", kwargs={"pk": report.pk}))
+
+
 def exceldownload(request, pk: int):
     report = get_object_or_404(Report, pk=pk)
     if report.model.model_class() is None:
         return HttpResponseNotFound()
 
+    snapshot = (
+        ReportSnapshot.objects.filter(report=report).first()
+        if report.use_snapshot
+        else None
+    )
+    if snapshot is not None:
+        workbook = generate_excel(
+            snapshot.rows.all(),
+            {
+                header: lambda row, i=i: row.cells[i]
+                for i, header in enumerate(snapshot.headers)
+            },
+        )
+        workbook.title = report.name
+        if snapshot.totals is not None:
+            append_totals(workbook, [excel_cellvalue(t) for t in snapshot.totals])
+        return xlsxresponse(
+            workbook, workbook.title + f"-{datetime.date.today().isoformat()}"
+        )
+
+    reportcolumns = list(report.columns.all())
     columns = {
         column.header: lambda row, c=column: hg.render(
             c.render_element("row"), {"row": row}
         )
-        for column in report.columns.all()
+        for column in reportcolumns
     }
     if not columns:
         columns = {
@@ -181,9 +387,32 @@ def exceldownload(request, pk: int):
             for column in filter_fieldlist(report.model.model_class(), ["__all__"])
         }
 
-    workbook = generate_excel(report.queryset, columns)
+    queryset = report.queryset
+    workbook = generate_excel(queryset, columns)
     workbook.title = report.name
+    totals = report.aggregate(queryset, reportcolumns)
+    if totals is not None:
+        append_totals(workbook, totals)
 
     return xlsxresponse(
         workbook, workbook.title + f"-{datetime.date.today().isoformat()}"
     )
+
+
+def append_totals(workbook, totals):
+    from openpyxl.styles import Font
+
+    workbook.active.append(totals)
+    for cell in workbook.active[workbook.active.max_row]:
+        cell.font = Font(bold=True)
+
+
+def aggregation_footer(report, queryset, columns):
+    """Footer row with the aggregated values of the report columns, if there are any"""
+    values = report.aggregate(queryset, columns)
+    if values is None:
+        return None
+    return [
+        formatters.format_value(value) if column.aggregation else ""
+        for column, value in zip(columns, values)
+    ]
@@ -8,9 +8,11 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from kombu.utils.uuid import uuid
 
-from .tasks import run_action
+from . import registry
+from .tasks import run_action, run_action_batch
 
 TRIGGER_PERIOD = getattr(settings, "TRIGGER_PERIOD", datetime.timedelta(hours=1))
+TRIGGER_BATCH_SIZE = getattr(settings, "TRIGGER_BATCH_SIZE", 500)
 
 
 class TriggersConfig(AppConfig):
@@ -19,13 +21,32 @@ class TriggersConfig(AppConfig):
     verbose_name = _("Triggered actions")
 
     def ready(self):
-        from django.db.models.signals import post_save, pre_delete, pre_save
+        from django.db.models.signals import (
+            post_delete,
+            post_migrate,
+            post_save,
+            pre_delete,
+            pre_migrate,
+            pre_save,
+        )
 
         from basxbread.utils.celery import RepeatedTask
 
         pre_save.connect(get_old_object)
         post_save.connect(save_handler)
         pre_delete.connect(delete_handler, dispatch_uid="trigger_delete")
+        post_save.connect(
+            registry.invalidate_handler, dispatch_uid="trigger_registry_save"
+        )
+        post_delete.connect(
+            registry.invalidate_handler, dispatch_uid="trigger_registry_delete"
+        )
+        pre_migrate.connect(
+            registry.migrate_handler, dispatch_uid="trigger_registry_pre_migrate"
+        )
+        post_migrate.connect(
+            registry.migrate_handler, dispatch_uid="trigger_registry_post_migrate"
+        )
 
         shared_task(
             base=RepeatedTask,
@@ -34,14 +55,26 @@ class TriggersConfig(AppConfig):
         )(periodic_trigger)
 
 
-# make sure we have access to the old value so we can change for field changes
+# make sure we have access to the old value so we can check for field changes
 def get_old_object(sender, instance, **kwargs):
+    from django.core.exceptions import FieldDoesNotExist
+
     instance._old = None
-    if instance.pk:
-        try:
-            instance._old = type(instance).objects.get(pk=instance.pk)
-        except type(instance).DoesNotExist:
-            pass
+    if not instance.pk:
+        return
+    fields = registry.watched_fields(sender)
+    if not fields:
+        return
+    queryset = type(instance).objects.all()
+    try:
+        if all(sender._meta.get_field(f).concrete for f in fields):
+            queryset = queryset.only(*fields)
+    except FieldDoesNotExist:  # properties and other attributes
+        pass
+    try:
+        instance._old = queryset.get(pk=instance.pk)
+    except type(instance).DoesNotExist:
+        pass
 
 
 def save_handler(sender, instance, created, **kwargs):
@@ -53,83 +86,78 @@ def delete_handler(sender, instance, **kwargs):
 
 
 def datachange_trigger(model, instance, type):
-    from django.contrib.contenttypes.models import ContentType
-
-    from .models import DataChangeTrigger
+    for trigger, queryset, fields in registry.get_triggers(model, type):
+        if type == "changed" and fields and instance._old is not None:
+            if all(  # if none of the fields has changed, skip this trigger
+                getattr(instance, field, None) == getattr(instance._old, field, None)
+                for field in fields
+            ):
+                continue
 
-    contenttypes = ContentType.objects.filter(
-        app_label=model._meta.app_label, model=model._meta.model_name
-    )
-    for contenttype in contenttypes:
-        for trigger in DataChangeTrigger.objects.filter(
-            model=contenttype, type=type, enable=True
+        # the filter for new objects will be run in the on_commit code, as
+        # we need the value to be inside the database
+        if trigger.action_id and (
+            type == "added" or queryset.filter(pk=instance.pk).exists()
         ):
-            if type == "changed" and trigger.field and instance._old is not None:
-                fields = [i.strip() for i in trigger.field.split(",")]
-                if all(  # if none of the fields has changed, skip this trigger
-                    getattr(instance, field, None)
-                    == getattr(instance._old, field, None)
-                    for field in fields
+            name = f"Trigger '{trigger}': Action '{trigger.action}'"
+            if type == "deleted":
+                # if we want to still have access to the database object
+                # while the action is performed, we need to execute the action
+                # immediately and cannot do it in the background with celery
+                run_action(trigger.action_id, instance._meta.label, instance.pk)
+            elif type == "changed":
+                transaction.on_commit(
+                    lambda action_pk=trigger.action_id, name=name: run_action.apply_async(
+                        (action_pk, instance._meta.label, instance.pk),
+                        shadow=name,
+                        task_id=f"{name}-{uuid()}",
+                    )
+                )
+            elif type == "added":
+
+                def post_commit(
+                    action_pk=trigger.action_id,
+                    queryset=queryset,
+                    theinstance=instance,
+                    name=name,
                 ):
-                    continue
-
-            # the filter for new objects will be run in the on_commit code, as
-            # we need the value to be inside the database
-            if trigger.action and (
-                trigger.filter.queryset.filter(pk=instance.pk).exists()
-                or type == "added"
-            ):
-                name = f"Trigger '{trigger}': Action '{trigger.action}'"
-                if type == "deleted":
-                    # if we want to still have access to the database object
-                    # while the action is performed, we need to execute the action
-                    # immediately and cannot do it in the background with celery
-                    run_action(trigger.action.pk, instance._meta.label, instance.pk)
-                elif type == "changed":
-                    transaction.on_commit(
-                        lambda action_pk=trigger.action.pk: run_action.apply_async(
-                            (action_pk, instance._meta.label, instance.pk),
+                    if queryset.filter(pk=theinstance.pk).exists():
+                        run_action.apply_async(
+                            (action_pk, theinstance._meta.label, theinstance.pk),
                             shadow=name,
                             task_id=f"{name}-{uuid()}",
                         )
-                    )
-                elif type == "added":
-
-                    def post_commit(thetrigger=trigger, theinstance=instance):
-                        if thetrigger.filter.queryset.filter(
-                            pk=theinstance.pk
-                        ).exists():
-                            run_action.apply_async(
-                                (
-                                    thetrigger.action.pk,
-                                    theinstance._meta.label,
-                                    theinstance.pk,
-                                ),
-                                shadow=name,
-                                task_id=f"{name}-{uuid()}",
-                            )
-
-                    transaction.on_commit(post_commit)
+
+                transaction.on_commit(post_commit)
     instance._old = None
 
 
 def periodic_trigger():
     from .models import DateFieldTrigger
 
-    print(
-        f"Running trigger in range: {timezone.now()} - {timezone.now() + TRIGGER_PERIOD}"
-    )
-    for trigger in DateFieldTrigger.objects.filter(enable=True):
-        for instance in trigger.filter.queryset.all():
-            for td in trigger.triggerdates(instance):
-                if (
-                    td is not None
-                    and timezone.now() <= td < timezone.now() + TRIGGER_PERIOD
-                ) and trigger.action:
-                    name = f"trigger '{trigger}': Action '{trigger.action}'"
-                    print(f"Running {name}")
-                    run_action.apply_async(
-                        (trigger.action.pk, instance._meta.label, instance.pk),
-                        shadow=name,
-                        task_id=f"{name}-{uuid()}",
-                    )
+    start = timezone.now()
+    end = start + TRIGGER_PERIOD
+    print(f"Running trigger in range: {start} - {end}")
+    for trigger in DateFieldTrigger.objects.filter(
+        enable=True, action__isnull=False
+    ).select_related("model", "action"):
+        due = [
+            instance.pk
+            for instance in trigger.due_queryset(start, end).iterator()
+            for td in trigger.triggerdates(instance)
+            if td is not None and start <= td < end
+        ]
+        if due:
+            name = f"trigger '{trigger}': Action '{trigger.action}'"
+            print(f"Running {name} for {len(due)} objects")
+            dispatch_batches(trigger.action_id, trigger.model.model_class(), due, name)
+
+
+def dispatch_batches(action_pk, model, pks, name):
+    """Runs the action in celery tasks with at most TRIGGER_BATCH_SIZE objects each"""
+    for i in range(0, len(pks), TRIGGER_BATCH_SIZE):
+        run_action_batch.apply_async(
+            (action_pk, model._meta.label, pks[i : i + TRIGGER_BATCH_SIZE]),
+            shadow=name,
+            task_id=f"{name}-{uuid()}",
+        )
@@ -1,4 +1,5 @@
 import datetime
+import logging
 import typing
 
 import htmlgenerator as hg
@@ -6,10 +7,11 @@ from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.contrib.contenttypes.models import ContentType
-from django.core.exceptions import ValidationError
-from django.core.mail import send_mail
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.mail import get_connection, send_mail
 from django.db import models
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from basxbread import utils
@@ -60,6 +62,17 @@ class Action(models.Model):
     def run(self, object):
         raise NotImplementedError()
 
+    def run_batch(self, objects, **kwargs):
+        """Runs the action for each object and returns the objects for which it failed"""
+        failed = []
+        for object in objects:
+            try:
+                self.run(object, **kwargs)
+            except Exception:
+                logging.exception(f"Action '{self}' failed for {object!r}")
+                failed.append(object)
+        return failed
+
     def __str__(self):
         return self.description
 
@@ -84,39 +97,66 @@ class SendEmail(Action):
         ),
     )
 
-    def run(self, object):
+    @cached_property
+    def _templates(self):
+        return utils.jinja_template(self.subject), utils.jinja_template(self.message)
+
+    @cached_property
+    def _recipients(self):
+        """
+        Users, groups and email addresses are resolved once per action instance,
+        accessors on the object are returned as string to be resolved per object
+        """
         recipients = []
         for email in self.email.split(","):
             email = email.strip()
             if email.startswith("@"):
                 user = get_user_model().objects.filter(username=email[1:]).first()
                 if user and user.email:
-                    recipients.append(user.email)
+                    recipients.append([user.email])
                 else:
-                    users = Group.objects.filter(name=email[1:]).first().user_set.all()
-                    recipients.extend(u.email for u in users if u.email)
+                    group = Group.objects.filter(name=email[1:]).first()
+                    users = group.user_set.all() if group else ()
+                    recipients.append([u.email for u in users if u.email])
             elif is_email_simple(email):
+                recipients.append([email])
+            else:
                 recipients.append(email)
-            else:  # try to get value from object via accessor
-                extracted_emails = hg.resolve_lookup({"object": object}, email) or ""
-                if not isinstance(extracted_emails, (list, tuple)):
-                    extracted_emails = [extracted_emails]
-                for email in extracted_emails:
-                    if is_email_simple(email):
-                        recipients.append(email)
+        return recipients
+
+    def run(self, object, connection=None):
+        recipients = []
+        for entry in self._recipients:
+            if not isinstance(entry, str):
+                recipients.extend(entry)
+                continue
+            # try to get value from object via accessor
+            extracted_emails = hg.resolve_lookup({"object": object}, entry) or ""
+            if not isinstance(extracted_emails, (list, tuple)):
+                extracted_emails = [extracted_emails]
+            for email in extracted_emails:
+                if is_email_simple(email):
+                    recipients.append(email)
 
         if recipients:
+            subject, message = self._templates
             send_mail(
-                subject=utils.jinja_render(self.subject, object=object),
-                message=utils.jinja_render(self.message, object=object),
+                subject=subject.render(object=object),
+                message=message.render(object=object),
                 from_email=None,
                 recipient_list=recipients,
+                connection=connection,
             )
         else:
             raise RuntimeError(
                 f"No recipients found for {self} (email: '{self.email}')"
             )
 
+    def run_batch(self, objects, **kwargs):
+        # send all emails over the same connection
+        with get_connection() as connection:
+            return super().run_batch(objects, connection=connection, **kwargs)
+
     class Meta:
         verbose_name = _("Send email action")
         verbose_name_plural = _("Send email actions")
@@ -230,6 +270,50 @@ class DateFieldTrigger(Trigger):
                 field_value + INTERVAL_CHOICES[self.offset_type][0] * self.offset_amount
             )
 
+    def due_queryset(self, start, end):
+        """
+        Returns the objects of the filter which can have a trigger date in the
+        range [start, end). The range is checked in the database, as far as the
+        fields allow it, the exact check is still done with triggerdates.
+        """
+        queryset = self.filter.queryset
+        if queryset is None:
+            return self.model.model_class()._default_manager.none()
+        # shift the range instead of the values, so that indexes can be used
+        offset = INTERVAL_CHOICES[self.offset_type][0] * self.offset_amount
+        start, end = start - offset, end - offset
+        # date values are compared at midnight in the current timezone and
+        # datetime values are extracted in the current timezone by the database
+        # so one day of margin covers the differences between timezones
+        first_day = timezone.localdate(start) - datetime.timedelta(days=1)
+        last_day = timezone.localdate(end) + datetime.timedelta(days=1)
+
+        q = models.Q()
+        for field in (f.strip() for f in self.field.split(",")):
+            try:
+                modelfield = queryset.model._meta.get_field(field)
+            except FieldDoesNotExist:
+                return queryset  # properties and methods can only be checked in python
+            if isinstance(modelfield, models.DateTimeField) and not self.ignore_year:
+                q |= models.Q(**{f"{field}__gte": start, f"{field}__lt": end})
+            elif isinstance(modelfield, models.DateField) and not self.ignore_year:
+                q |= models.Q(**{f"{field}__gte": first_day, f"{field}__lte": last_day})
+            elif isinstance(modelfield, models.DateField):
+                if (last_day - first_day).days >= 365:
+                    return queryset
+                days: typing.Dict[int, typing.Set[int]] = {}
+                day = first_day
+                while day <= last_day:
+                    days.setdefault(day.month, set()).add(day.day)
+                    day += datetime.timedelta(days=1)
+                for month, monthdays in days.items():
+                    q |= models.Q(
+                        **{f"{field}__month": month, f"{field}__day__in": monthdays}
+                    )
+            else:
+                return queryset
+        return queryset.filter(q)
+
     class Meta:
         verbose_name = _("Date trigger")
         verbose_name_plural = _("Date triggers")
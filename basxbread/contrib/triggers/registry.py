@@ -0,0 +1,136 @@
+import contextlib
+import threading
+import time
+import typing
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Changes to triggers and actions increment a version in the django cache,
+# other processes (e.g. celery workers) reload the registry when the version
+# changed. With a cache which is not shared between processes, the registry
+# is reloaded after this many seconds at the latest. None means no expiration.
+TRIGGER_REGISTRY_TIMEOUT = getattr(settings, "TRIGGER_REGISTRY_TIMEOUT", 60)
+TRIGGER_REGISTRY_VERSION_KEY = "basxbread.triggers.registry.version"
+
+
+class RegisteredTrigger(typing.NamedTuple):
+    trigger: typing.Any
+    queryset: typing.Any  # the compiled filter of the trigger
+    fields: typing.Tuple[str, ...]
+
+
+_registry: typing.Optional[dict] = None
+_loaded_at = 0.0
+_version: typing.Optional[int] = None  # the version in the cache when loaded
+_lock = threading.Lock()
+_migrating = False
+
+
+class _Local(threading.local):
+    # number of nested suspend_triggers contexts in the current thread
+    suspended = 0
+
+
+_local = _Local()
+
+
+def get_triggers(model, type) -> typing.Tuple[RegisteredTrigger, ...]:
+    """
+    Returns the enabled data change triggers for the given model and event type.
+    All triggers are loaded with a single query on first access, after that a
+    lookup does not hit the database until the registry has been invalidated
+    (it only reads the version of the registry from the cache).
+    """
+    if _migrating or _local.suspended:
+        return ()
+    registry = _registry
+    if (
+        registry is None
+        or (
+            TRIGGER_REGISTRY_TIMEOUT is not None
+            and time.monotonic() - _loaded_at > TRIGGER_REGISTRY_TIMEOUT
+        )
+        or cache.get(TRIGGER_REGISTRY_VERSION_KEY) != _version
+    ):
+        registry = _load()
+    return registry.get((model._meta.app_label, model._meta.model_name, type), ())
+
+
+def watched_fields(model) -> typing.FrozenSet[str]:
+    """Returns the fields which enabled "changed" triggers compare on the model"""
+    return frozenset(
+        field for trigger in get_triggers(model, "changed") for field in trigger.fields
+    )
+
+
+@contextlib.contextmanager
+def suspend_triggers():
+    """
+    Data change triggers are not run for changes inside this context (in the
+    current thread), e.g. for bulk imports.
+    """
+    _local.suspended += 1
+    try:
+        yield
+    finally:
+        _local.suspended -= 1
+
+
+def invalidate():
+    """Invalidates the registry of the current process"""
+    global _registry
+    _registry = None
+
+
+def invalidate_all():
+    """Invalidates the registry of all processes which share the cache"""
+    invalidate()
+    if not cache.add(TRIGGER_REGISTRY_VERSION_KEY, 1, timeout=None):
+        try:
+            cache.incr(TRIGGER_REGISTRY_VERSION_KEY)
+        except ValueError:  # the key has just expired or been evicted
+            cache.set(TRIGGER_REGISTRY_VERSION_KEY, 1, timeout=None)
+
+
+def migrate_handler(sender, **kwargs):
+    global _migrating
+    from django.db.models.signals import pre_migrate
+
+    _migrating = kwargs["signal"] is pre_migrate
+    invalidate()
+
+
+def invalidate_handler(sender, **kwargs):
+    from django.db import transaction
+
+    from .models import Action, DataChangeTrigger
+
+    if issubclass(sender, (Action, DataChangeTrigger)):
+        invalidate_all()
+        # a reload inside the transaction may have seen uncommitted changes
+        transaction.on_commit(invalidate_all)
+
+
+def _load():
+    global _registry, _loaded_at, _version
+    from .models import DataChangeTrigger
+
+    with _lock:
+        # read before the triggers, a change in between causes another reload
+        version = cache.get(TRIGGER_REGISTRY_VERSION_KEY)
+        registry = {}
+        for trigger in DataChangeTrigger.objects.filter(enable=True).select_related(
+            "model", "action"
+        ):
+            queryset = trigger.filter.queryset
+            if queryset is None:  # triggers with an invalid filter never match
+                continue
+            fields = tuple(f.strip() for f in trigger.field.split(",") if f.strip())
+            registry.setdefault(
+                (trigger.model.app_label, trigger.model.model, trigger.type), []
+            ).append(RegisteredTrigger(trigger, queryset, fields))
+        _registry = {key: tuple(value) for key, value in registry.items()}
+        _loaded_at = time.monotonic()
+        _version = version
+        return _registry
@@ -12,3 +12,30 @@ def run_action(action_pk, modelname, instance_pk):
     get_concrete_instance(Action.objects.get(pk=action_pk)).run(
         apps.get_model(modelname).objects.get(pk=instance_pk)
     )
+
+
+@shared_task
+def run_action_batch(action_pk, modelname, instance_pks):
+    """
+    Runs the action for all given objects. The action is loaded once and the
+    objects with a single query, objects which do not exist anymore are skipped.
+    A failing object does not stop the action for the remaining objects.
+    """
+    from django.apps import apps
+
+    from .models import Action
+
+    action = get_concrete_instance(Action.objects.get(pk=action_pk))
+    # pks might have been serialized as strings, e.g. UUIDs
+    model = apps.get_model(modelname)
+    instances = {
+        str(pk): instance
+        for pk, instance in model.objects.in_bulk(instance_pks).items()
+    }
+    failed = action.run_batch(
+        [instances[str(pk)] for pk in instance_pks if str(pk) in instances]
+    )
+    if failed:
+        raise RuntimeError(
+            f"Action '{action}' failed for {modelname} {[i.pk for i in failed]}"
+        )
@@ -11,6 +11,7 @@ from basxbread.utils import (
     filter_fieldlist,
     link_with_urlparameters,
     permissionname,
+    related_lookups,
     resolve_modellookup,
 )
 
@@ -116,6 +117,7 @@ class DataTable(hg.TABLE):
         spacing: str = "default",
         zebra: bool = False,
         sticky: bool = False,
+        footer: Optional[Iterable[Any]] = None,
         **kwargs: Any,
     ):
         """A carbon DataTable element
@@ -130,6 +132,7 @@ class DataTable(hg.TABLE):
                                      table ordering.
         :param spacing: One of "default", "compact", "short", "tall", according to the carbon styles
         :param zebra: If True alternate row colors
+        :param footer: Optional values for a footer row, one per column, e.g. totals
         :param kwargs: HTML element attributes
         """
 
@@ -144,6 +147,13 @@ class DataTable(hg.TABLE):
             DataTable.tableclasses(spacing, zebra, sticky)
         )
         super().__init__(hg.THEAD(self.head), hg.TBODY(self.iterator), **kwargs)
+        if footer is not None:
+            self.append(
+                hg.TFOOT(
+                    hg.TR(*[hg.TD(value) for value in footer]),
+                    style="font-weight: bold",
+                )
+            )
 
     def with_toolbar(
         self,
@@ -151,7 +161,7 @@ class DataTable(hg.TABLE):
         helper_text: Any = None,
         primary_button: Optional[Button] = None,
         bulkactions: Iterable[Link] = (),
-        pagination_config: Optional[PaginationConfig] = None,
+        pagination_config: Union[None, PaginationConfig, hg.Lazy] = None,
         checkbox_for_bulkaction_name: str = "_selected",
         search_urlparameter: Optional[str] = None,
         settingspanel: Any = None,
@@ -290,7 +300,7 @@ let settings = this.parentElement.parentElement.parentElement.querySelector('.se
 settings.style.display = settings.style.display == 'block' ? 'none' : 'block';
 event.stopPropagation()""",
                         )
-                        if settingspanel
+                        if settingspanel is not None
                         else None
                     ),
                     primary_button or None,
@@ -313,7 +323,7 @@ event.stopPropagation()""",
                 onclick="event.stopPropagation()",
             ),
             (self.with_sidescrolling() if sidescrolling else self),
-            Pagination.from_config(pagination_config) if pagination_config else None,
+            hg.F(lambda c: _pagination(hg.resolve_lazy(pagination_config, c))),
             _class="bx--data-table-container",
             data_table=True,
         )
@@ -340,16 +350,22 @@ event.stopPropagation()""",
         title=None,
         primary_button: Optional[Button] = None,
         settingspanel: Any = None,
-        pagination_config: Optional[PaginationConfig] = None,
+        pagination_config: Union[None, PaginationConfig, hg.Lazy] = None,
         search_urlparameter: Optional[str] = None,
         model=None,  # required if queryset is Lazy
         sidescrolling: bool = False,
         rowactions_first_column: bool = False,
+        optimize_related_lookups: bool = True,
         **kwargs,
     ):
         """TODO: Write Docs!!!!
         Yeah yeah, on it already...
 
+        :param optimize_related_lookups: Add select_related/prefetch_related to the
+                                         queryset for all relationships which are
+                                         accessed by the columns. Has no effect if
+                                         queryset is of type hg.Lazy.
+
         :param settingspanel: A panel which will be opened when clicking on the
                               "Settings" button of the datatable, usefull e.g.
                               for showing filter options. Currently only one
@@ -367,6 +383,8 @@ event.stopPropagation()""",
             )
 
         columns = columns or filter_fieldlist(model, ["__all__"])
+        if optimize_related_lookups and isinstance(queryset, models.QuerySet):
+            queryset = optimize_queryset_for_columns(queryset, columns, rowvariable)
 
         if title is None:
             title = model._meta.verbose_name_plural
@@ -462,30 +480,35 @@ event.stopPropagation()""",
         else:
             all_columns = column_definitions + row_action_column
 
+        if "helper_text" in kwargs:
+            helper_text = kwargs.pop("helper_text")
+        else:
+
+            def default_helper_text(c):
+                config = hg.resolve_lazy(pagination_config, c)
+                if config is not None:
+                    count = config.paginator.count
+                else:
+                    # evaluates the queryset, but the result cache is reused for the rows
+                    count = len(hg.resolve_lazy(queryset, c))
+                return "{} {}".format(
+                    count,
+                    (
+                        model._meta.verbose_name
+                        if count == 1
+                        else model._meta.verbose_name_plural
+                    ),
+                )
+
+            helper_text = hg.F(default_helper_text)
+
         return DataTable(
             all_columns,
             queryset,
             **kwargs,
         ).with_toolbar(
             title,
-            helper_text=kwargs.get(
-                "helper_text",
-                hg.format(
-                    "{} {}",
-                    hg.F(
-                        lambda c: (
-                            len(hg.resolve_lazy(queryset, c))
-                            if pagination_config is None
-                            else pagination_config.paginator.count
-                        )
-                    ),
-                    hg.If(
-                        hg.F(lambda c: hg.resolve_lazy(queryset.count(), c) == 1),
-                        model._meta.verbose_name,
-                        model._meta.verbose_name_plural,
-                    ),
-                ),
-            ),
+            helper_text=helper_text,
             primary_button=primary_button,
             bulkactions=bulkactions,
             pagination_config=pagination_config,
@@ -589,6 +612,37 @@ class DataTableColumn(NamedTuple):
         return hg.TH(headcontent, lazy_attributes=self.th_attributes)
 
 
+def column_accessor(column, rowvariable="row"):
+    """Returns the accessor string of a column if its cell displays a field of the row"""
+    if isinstance(column, str):
+        return column
+    if (
+        isinstance(column, DataTableColumn)
+        and isinstance(column.cell, ObjectFieldValue)
+        and column.cell.object == rowvariable
+    ):
+        return column.cell.fieldname
+    return None
+
+
+def optimize_queryset_for_columns(queryset, columns, rowvariable="row"):
+    """Applies select_related and prefetch_related for the relationships
+    which will be accessed when rendering the given columns"""
+    select_related, prefetch_related = related_lookups(
+        queryset.model,
+        [
+            accessor
+            for accessor in (column_accessor(col, rowvariable) for col in columns)
+            if accessor
+        ],
+    )
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
+
+
 def sortingclass_for_column(orderingurlparameter, columnname):
     def extracturlparameter(context):
         value = context["request"].GET.get(orderingurlparameter, "")
@@ -691,3 +745,7 @@ def searchbar(search_urlparameter: str):
         ),
         _class="bx--toolbar-search-container-persistent",
     )
+
+
+def _pagination(pagination_config):
+    return Pagination.from_config(pagination_config) if pagination_config else None
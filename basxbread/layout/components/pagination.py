@@ -1,7 +1,15 @@
-from typing import Iterator, NamedTuple
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+from typing import Iterator, NamedTuple, Union
 
 import htmlgenerator as hg
 from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from basxbread.utils.urls import link_with_urlparameters
@@ -12,7 +20,7 @@ from .icon import Icon
 
 
 class PaginationConfig(NamedTuple):
-    paginator: Paginator
+    paginator: Union[Paginator, "KeysetPaginator"]
     items_per_page_options: Iterator
     page_urlparameter: str = (
         "page"  # URL parameter which holds value for current page selection
@@ -161,6 +169,8 @@ class Pagination(hg.DIV):
 
     @classmethod
     def from_config(cls, pagination_config):
+        if isinstance(pagination_config.paginator, KeysetPaginator):
+            cls = KeysetPagination
         return cls(
             paginator=pagination_config.paginator,
             items_per_page_options=pagination_config.items_per_page_options,
@@ -212,3 +222,282 @@ def get_page(paginator, page_urlparameter):
         )
 
     return hg.F(wrapper)
+
+
+class KeysetPagination(hg.DIV):
+    """Pagination for a KeysetPaginator, page_urlparameter holds the cursor"""
+
+    def __init__(
+        self,
+        paginator,
+        items_per_page_options,
+        page_urlparameter="cursor",
+        itemsperpage_urlparameter="itemsperpage",
+        **kwargs,
+    ):
+        select1_id = hg.html_id(self)
+        kwargs["_class"] = kwargs.get("_class", "") + " bx--pagination"
+        kwargs["data_pagination"] = True
+        page = paginator.current_page
+        super().__init__(
+            hg.DIV(
+                hg.LABEL(
+                    _("Items per page"),
+                    ":",
+                    _class="bx--pagination__text",
+                    _for=select1_id,
+                ),
+                Select(
+                    choices=[
+                        (
+                            linkwithitemsperpage(
+                                itemsperpage_urlparameter,
+                                page_urlparameter,
+                                itemsperpage=i,
+                            ),
+                            _("All") if i == -1 else i,
+                        )
+                        for i in items_per_page_options
+                    ],
+                    inline=True,
+                    inputelement_attrs={
+                        "data_items_per_page": True,
+                        "onchange": "document.location = this.value",
+                        "onauxclick": "window.open(this.value, '_blank')",
+                        "value": linkwithitemsperpage(
+                            itemsperpage_urlparameter,
+                            page_urlparameter,
+                        ),
+                    },
+                    _class="bx--select__item-count",
+                ),
+                hg.SPAN(
+                    hg.SPAN(
+                        hg.F(lambda c: paginator.display_count()),
+                        " ",
+                        data_total_items=True,
+                    ),
+                    _("items"),
+                    _class="bx--pagination__text",
+                ),
+                _class="bx--pagination__left",
+            ),
+            hg.DIV(
+                hg.BUTTON(
+                    Icon("caret--left", size=20, _class="bx--pagination__nav-arrow"),
+                    _class="bx--pagination__button bx--pagination__button--backward",
+                    tabindex="0",
+                    type="button",
+                    disabled=hg.F(lambda c: not page.has_previous()),
+                    data_page_backward=True,
+                    **aslink_attributes(
+                        linktopage(
+                            page_urlparameter, hg.F(lambda c: page.previous_cursor)
+                        )
+                    ),
+                ),
+                hg.BUTTON(
+                    Icon("caret--right", size=20, _class="bx--pagination__nav-arrow"),
+                    _class="bx--pagination__button bx--pagination__button--forward",
+                    tabindex="0",
+                    type="button",
+                    disabled=hg.F(lambda c: not page.has_next()),
+                    data_page_forward=True,
+                    **aslink_attributes(
+                        linktopage(page_urlparameter, hg.F(lambda c: page.next_cursor))
+                    ),
+                ),
+                _class="bx--pagination__right",
+            ),
+            **kwargs,
+        )
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by seeking on the values of its ordering plus the
+    primary key instead of using OFFSET. Pages are addressed by cursor tokens
+    which are returned by KeysetPage.next_cursor and KeysetPage.previous_cursor.
+    This is fast on large tables, but does not allow to jump to a page number.
+    NULL values are always sorted last, independent of the database.
+    If approximate_count is True, ``count`` uses the estimate of the query
+    planner on PostgreSQL instead of an exact COUNT(*).
+    """
+
+    def __init__(self, queryset, per_page, cursor=None, approximate_count=False):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.cursor = cursor
+        self.approximate_count = approximate_count
+        self.count_is_approximate = False
+
+    @cached_property
+    def ordering(self):
+        """List of (expression, descending) tuples, ending with the primary key"""
+        query = self.queryset.query
+        ordering = list(query.order_by) or (
+            list(self.queryset.model._meta.ordering) if query.default_ordering else []
+        )
+        ret = []
+        for order in ordering:
+            if isinstance(order, str):
+                if order == "?":
+                    continue
+                ret.append((models.F(order.lstrip("-")), order.startswith("-")))
+            elif isinstance(order, models.OrderBy):
+                ret.append((order.expression, order.descending))
+            elif hasattr(order, "resolve_expression"):
+                ret.append((order, False))
+        ret.append((models.F("pk"), False))
+        return ret
+
+    @cached_property
+    def count(self):
+        if self.approximate_count:
+            estimate = approximate_count(self.queryset)
+            if estimate is not None:
+                self.count_is_approximate = True
+                return estimate
+        return self.queryset.count()
+
+    def display_count(self):
+        count = self.count
+        return f"~{count}" if self.count_is_approximate else str(count)
+
+    @cached_property
+    def current_page(self):
+        return self.page(self.cursor)
+
+    def page(self, cursor=None):
+        values, backwards = decode_cursor(cursor, self._signature)
+        aliases = [f"_keyset{i}" for i in range(len(self.ordering))]
+        qs = self.queryset.annotate(
+            **{alias: expr for alias, (expr, _desc) in zip(aliases, self.ordering)}
+        ).order_by(
+            *(
+                # reversed order for seeking backwards, NULL is always last in forward direction
+                models.OrderBy(
+                    models.F(alias),
+                    descending=desc != backwards,
+                    nulls_last=None if backwards else True,
+                    nulls_first=True if backwards else None,
+                )
+                for alias, (_expr, desc) in zip(aliases, self.ordering)
+            )
+        )
+        if values is not None:
+            qs = qs.filter(self._seek(aliases, values, backwards))
+        objects = list(qs[: self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[: self.per_page]
+        if backwards:
+            objects.reverse()
+        return KeysetPage(
+            objects,
+            self,
+            has_next=True if backwards else has_more,
+            has_previous=has_more if backwards else values is not None,
+            keys=[[getattr(obj, alias) for alias in aliases] for obj in objects],
+        )
+
+    def _seek(self, aliases, values, backwards):
+        """Filter for all rows after (or before) the row with the given values"""
+        ret = models.Q(pk__in=[])
+        equal = models.Q()
+        for alias, (_expr, desc), value in zip(aliases, self.ordering, values):
+            if value is None:
+                if backwards:
+                    ret |= equal & models.Q(**{f"{alias}__isnull": False})
+                equal &= models.Q(**{f"{alias}__isnull": True})
+            else:
+                lookup = "lt" if desc != backwards else "gt"
+                condition = models.Q(**{f"{alias}__{lookup}": value})
+                if not backwards:
+                    condition |= models.Q(**{f"{alias}__isnull": True})
+                ret |= equal & condition
+                equal &= models.Q(**{alias: value})
+        return ret
+
+    @cached_property
+    def _signature(self):
+        # cursors are only valid for the ordering they have been created with
+        return hashlib.md5(
+            repr([(str(expr), desc) for expr, desc in self.ordering]).encode(),
+            usedforsecurity=False,
+        ).hexdigest()[:8]
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, has_next, has_previous, keys):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self._keys = keys
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or not self._keys:
+            return None
+        return encode_cursor(self._keys[-1], False, self.paginator._signature)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or not self._keys:
+            return None
+        return encode_cursor(self._keys[0], True, self.paginator._signature)
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder truncates microseconds, but seeking needs exact values
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values, backwards, signature):
+    return base64.urlsafe_b64encode(
+        json.dumps([signature, backwards, values], cls=_CursorEncoder).encode()
+    ).decode()
+
+
+def decode_cursor(cursor, signature):
+    """Returns (values, backwards), invalid cursors will start at the first page"""
+    if not cursor:
+        return None, False
+    try:
+        cursorsignature, backwards, values = json.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        return None, False
+    if cursorsignature != signature or not isinstance(values, list):
+        return None, False
+    return values, bool(backwards)
+
+
+def approximate_count(queryset):
+    """
+    Returns the estimated number of rows of a queryset from the query planner
+    or None if the database does not support estimates (only PostgreSQL for now)
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -1,7 +1,9 @@
 import datetime
+import functools
 
 import htmlgenerator as hg
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
 from django.db.models import ManyToOneRel
 from django.db.models.fields.related_descriptors import ReverseManyToOneDescriptor
@@ -116,20 +118,15 @@ class ObjectFieldValue(hg.Lazy):
             object = resolve_modellookup(context, self.object)[0]
         object = hg.resolve_lazy(object, context)
 
-        parts = self.fieldname.split(".")
-        # test if the value has a matching get_FIELDNAME_display function
-        try:
-            value = hg.resolve_lookup(
-                object, f"{'.'.join(parts[:-1])}.get_{parts[-1]}_display".lstrip(".")
-            )
-        except Exception:
-            value = None
-        if value is None:
-            try:
-                value = hg.resolve_lookup(object, self.fieldname)
-            except AttributeError:
-                # e.g. for non-existing OneToOneField related value
-                pass
+        accessor = (
+            compile_fieldaccessor(type(object), self.fieldname)
+            if isinstance(object, models.Model)
+            else None
+        )
+        if accessor is not None:
+            value = accessor(object)
+        else:
+            value = self._resolve_generic(object)
 
         if isinstance(value, models.fields.files.FieldFile) and not self.formatter:
             return as_download(value)
@@ -154,6 +151,74 @@ class ObjectFieldValue(hg.Lazy):
             value = linebreaksbr(value)
         return value
 
+    def _resolve_generic(self, object):
+        parts = self.fieldname.split(".")
+        # test if the value has a matching get_FIELDNAME_display function
+        try:
+            value = hg.resolve_lookup(
+                object, f"{'.'.join(parts[:-1])}.get_{parts[-1]}_display".lstrip(".")
+            )
+        except Exception:
+            value = None
+        if value is None:
+            try:
+                value = hg.resolve_lookup(object, self.fieldname)
+            except AttributeError:
+                # e.g. for non-existing OneToOneField related value
+                pass
+        return value
+
+
+@functools.lru_cache(maxsize=None)
+def compile_fieldaccessor(model, fieldname):
+    """
+    Returns a function which takes an instance of model and returns the value
+    for fieldname in the same way as ObjectFieldValue would resolve it with
+    hg.resolve_lookup, but as a direct attribute chain and with the lookup of
+    a get_FIELDNAME_display method already decided.
+    Returns None if the path contains anything else than model fields and
+    single-valued relationships, those need to be resolved dynamically.
+    """
+    try:
+        chain = resolve_modellookup(model, fieldname)
+    except (AttributeError, FieldDoesNotExist):
+        return None
+    owner = model
+    for field in chain[:-1]:
+        if (
+            not isinstance(field, (models.Field, models.ForeignObjectRel))
+            or not field.is_relation
+            or field.many_to_many
+            or field.one_to_many
+            or field.related_model is None
+        ):
+            return None
+        owner = field.related_model
+    if not isinstance(chain[-1], (models.Field, models.ForeignObjectRel)):
+        return None
+
+    *path, name = fieldname.split(".")
+    displayname = (
+        f"get_{name}_display" if hasattr(owner, f"get_{name}_display") else None
+    )
+
+    def accessor(object):
+        try:
+            for part in path:
+                object = getattr(object, part)
+                if object is None:
+                    return None
+            if displayname is not None:
+                value = getattr(object, displayname)()
+                if value is not None:
+                    return value
+            return getattr(object, name)
+        except AttributeError:
+            # e.g. for non-existing OneToOneField related value
+            return None
+
+    return accessor
+
 
 def store_scrollposition_js():
     # stores current scroll position on page, as long as user reload
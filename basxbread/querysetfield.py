@@ -66,6 +66,12 @@ class QuerysetField(models.TextField):
     def get_clean_value(self, value):
         return str(value)
 
+    def pre_save(self, model_instance, add):
+        # use the raw value, the descriptor would parse the query
+        if self.attname in model_instance.__dict__:
+            return model_instance.__dict__[self.attname]
+        return super().pre_save(model_instance, add)
+
     def get_prep_value(self, value):
         super().get_prep_value(self.get_clean_value(value))
 
@@ -0,0 +1,90 @@
+import os
+
+from celery import shared_task
+
+EXPORT_FORMATS = ("xlsx", "csv", "jsonl")
+
+
+@shared_task(bind=True)
+def export_browseview(self, path, querystring, user_pk, format="xlsx", notify_url=None):
+    """
+    Exports the result of a BrowseView into a file in the default storage.
+    The view is resolved from the URL path and set up with the given query
+    string, so the export contains exactly the rows which the user had
+    selected, filtered, searched and ordered when the export was started.
+    Progress is reported through the task state, the returned result contains
+    the name of the file in the default storage.
+    """
+    from django.contrib.auth import get_user_model
+    from django.core.files import File
+    from django.core.files.storage import default_storage
+    from django.core.mail import send_mail
+    from django.http import HttpRequest, QueryDict
+    from django.urls import resolve
+    from django.utils.translation import gettext as _
+
+    from .utils import (
+        generate_csv,
+        generate_excel_streaming,
+        generate_jsonlines,
+        spooled_lines,
+    )
+    from .views.browse import export_columndefinitions
+
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Export format must be one of {EXPORT_FORMATS}")
+
+    user = get_user_model().objects.get(pk=user_pk)
+    request = HttpRequest()
+    request.method = "GET"
+    request.path = request.path_info = path
+    request.GET = QueryDict(querystring)
+    request.user = user
+    request.session = {}
+
+    match = resolve(path)
+    view = match.func.view_class(**match.func.view_initkwargs)
+    view.setup(request, *match.args, **match.kwargs)
+    if not view.has_permission():
+        raise PermissionError(f"User {user} has no permission to export {path}")
+
+    queryset = view.get_final_queryset()
+    total = queryset.count()
+    chunk_size = 2000
+
+    def rows_with_progress():
+        for i, row in enumerate(queryset.iterator(chunk_size=chunk_size)):
+            if i % chunk_size == 0:
+                self.update_state(state="PROGRESS", meta={"current": i, "total": total})
+            yield row
+
+    columndefinitions = export_columndefinitions(queryset, view.columns, request)
+    if format == "xlsx":
+        file = generate_excel_streaming(
+            rows_with_progress(), columndefinitions, request=request
+        )
+    elif format == "csv":
+        file = spooled_lines(
+            generate_csv(rows_with_progress(), columndefinitions, request=request)
+        )
+    else:
+        file = spooled_lines(
+            generate_jsonlines(rows_with_progress(), columndefinitions, request=request)
+        )
+
+    filename = f"{queryset.model._meta.verbose_name_plural}.{format}"
+    with file:
+        filename = default_storage.save(
+            os.path.join("exports", str(self.request.id), filename), File(file)
+        )
+
+    if notify_url and user.email:
+        send_mail(
+            subject=_("Export of %s is ready") % queryset.model._meta.verbose_name,
+            message=_("Your export with %(count)s rows can be downloaded here: %(url)s")
+            % {"count": total, "url": notify_url},
+            from_email=None,
+            recipient_list=[user.email],
+            fail_silently=True,
+        )
+    return {"filename": filename, "user": user_pk, "rows": total}
@@ -0,0 +1,299 @@
+import re
+from urllib.parse import urlencode
+
+import htmlgenerator as hg
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.http import QueryDict
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import translation
+
+from .. import views
+from ..contrib.reports.models import Report, ReportColumn
+from ..utils import related_lookups
+from ..utils.urls import reverse_model
+from ..views.browse import parse_filterconfig
+
+
+class BrowseViewQueriesTest(TestCase):
+    def setUp(self):
+        for i in range(60):
+            User.objects.create(username=f"user{i:02d}")
+        self.client = Client()
+        self.client.force_login(
+            User.objects.create(username="admin", is_superuser=True)
+        )
+        self.url = str(reverse_model(User, "browse"))
+        self.client.get(self.url)
+
+    def test_browse_queries(self):
+        # session, user, one COUNT for toolbar and pagination, the page
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {"itemsperpage": 25, "page": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "61 users")
+        self.assertContains(response, "user49")
+        self.assertNotContains(response, "user50")
+
+    def test_browse_all_queries(self):
+        # session, user, all objects
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {"itemsperpage": -1})
+        self.assertContains(response, "user59")
+
+
+class CountingBrowseView(views.BrowseView):
+    model = User
+    cache_layout = True
+    builds = 0
+
+    def get_layout(self):
+        type(self).builds += 1
+        return super().get_layout()
+
+
+# csrf tokens and the generated element ids differ between renderings
+VOLATILE_REGEX = re.compile(r'name="csrfmiddlewaretoken" value="[^"]*"|id-\d+')
+
+
+class LayoutCacheTest(TestCase):
+    def setUp(self):
+        CountingBrowseView.invalidate_layout_cache()
+        CountingBrowseView.builds = 0
+        for i in range(60):
+            User.objects.create(username=f"user{i:02d}")
+        self.admin = User.objects.create(username="admin", is_superuser=True)
+
+    def get(self, view=CountingBrowseView, user=None, **params):
+        request = RequestFactory().get("/", {"itemsperpage": 25, **params})
+        request.user = user or self.admin
+        request.session = {}
+        response = view.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        return VOLATILE_REGEX.sub("", response.content.decode())
+
+    def test_layout_is_reused(self):
+        first = self.get(page=1)
+        second = self.get(page=2)
+        self.assertEqual(CountingBrowseView.builds, 1)
+        self.assertIn("user24", first)
+        self.assertNotIn("user25", first)
+        self.assertIn("user25", second)
+        self.assertNotIn("user24", second)
+        # the cached layout renders the same as a freshly built one
+        uncached = CountingBrowseView._with(cache_layout=False)
+        self.assertEqual(second, self.get(uncached, page=2))
+
+    def test_cache_key(self):
+        viewer = User.objects.create(username="viewer")
+        viewer.user_permissions.add(Permission.objects.get(codename="view_user"))
+        self.get()
+        with translation.override("de"):
+            self.get()
+        self.get(**{settings.AJAX_URLPARAMETER: True})
+        # a user without delete permission has other bulk actions
+        self.assertNotIn("trash-can", self.get(user=viewer))
+        self.assertEqual(CountingBrowseView.builds, 4)
+
+        self.get()
+        with translation.override("de"):
+            self.get()
+        self.get(user=viewer)
+        self.assertEqual(CountingBrowseView.builds, 4)
+
+    def test_invalidate(self):
+        self.get()
+        views.EditView.invalidate_layout_cache()
+        self.get()
+        self.assertEqual(CountingBrowseView.builds, 1)
+        views.BrowseView.invalidate_layout_cache()  # includes subclasses
+        self.get()
+        self.assertEqual(CountingBrowseView.builds, 2)
+
+
+class RelatedLookupsTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username="admin", is_superuser=True)
+        self.add_reports(10)
+
+    def add_reports(self, count):
+        contenttype = ContentType.objects.get_for_model(User)
+        start = Report.objects.count()
+        for i in range(start, start + count):
+            report = Report.objects.create(name=f"report{i}", model=contenttype)
+            report.columns.create(header=f"header{i}", column="username")
+            report.columns.create(header=f"email{i}", column="email")
+
+    def render(self, model, columns, **kwargs):
+        request = RequestFactory().get("/", {"itemsperpage": -1})
+        request.user = self.admin
+        request.session = {}
+        # the report columns have no views to link to
+        view = views.BrowseView._with(
+            model=model,
+            columns=columns,
+            rowactions=(),
+            primary_button=hg.BaseElement(),
+            **kwargs,
+        )
+        return view.as_view()(request)
+
+    def test_related_lookups(self):
+        self.assertEqual(
+            related_lookups(
+                ReportColumn, ["header", "report.name", "report.model.app_label"]
+            ),
+            (["report__model"], []),
+        )
+        self.assertEqual(
+            related_lookups(Report, ["name", "model", "columns", "columns.header"]),
+            (["model"], ["columns"]),
+        )
+        self.assertEqual(
+            related_lookups(ReportColumn, ["report.columns.header", "missing.field"]),
+            (["report"], ["report__columns"]),
+        )
+
+    def test_query_count_independent_of_rows(self):
+        for model, columns in (
+            (ReportColumn, ["header", "report.name", "report.model.app_label"]),
+            (Report, ["name", "model", "columns"]),
+        ):
+            self.render(model, columns)  # warm up caches
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.render(model, columns).status_code, 200)
+            with CaptureQueriesContext(connection) as unoptimized:
+                self.render(model, columns, optimize_related_lookups=False)
+            self.assertGreater(len(unoptimized), len(queries) + 10, model)
+
+            self.add_reports(10)
+            with self.assertNumQueries(len(queries)):
+                response = self.render(model, columns)
+            self.assertContains(response, "report19")
+
+
+class FilterConfigTest(TestCase):
+    def test_filterset_classes_are_cached(self):
+        filterset = parse_filterconfig(
+            User, ("and", "username", ("or", "email", "groups")), prefix="f"
+        )
+        self.assertIs(
+            filterset,
+            parse_filterconfig(
+                User, ["and", "username", ["or", "email", "groups"]], "f"
+            ),
+        )
+        self.assertIsNot(filterset, parse_filterconfig(User, ("and", "username"), "f"))
+        self.assertEqual(list(filterset.base_filters), ["username"])
+        self.assertEqual(
+            list(filterset.subgroup_classes[0].base_filters), ["email", "groups"]
+        )
+
+
+class FilterGroupQueryTest(TestCase):
+    filterconfig = (
+        "and",
+        "is_active",
+        ("or", "username", "email", ("and", "first_name", "last_name"), "groups"),
+    )
+
+    def setUp(self):
+        User.objects.bulk_create(
+            User(
+                username=f"user{i}",
+                email=f"user{i}@{'a' if i % 3 else 'b'}.org",
+                first_name="Ann" if i % 5 == 0 else "Bo",
+                last_name="Smith" if i % 7 == 0 else "Jones",
+                is_active=bool(i % 2),
+            )
+            for i in range(2000)
+        )
+        self.group = Group.objects.create(name="group")
+        self.group.user_set.set(User.objects.filter(username__endswith="3"))
+        self.filterset = parse_filterconfig(User, self.filterconfig, "f")
+
+    def filter(self, **params):
+        return self.filterset(
+            QueryDict(urlencode(params)), queryset=User.objects.all()
+        ).qs
+
+    def expected(self, condition):
+        return {
+            user.pk for user in User.objects.all() if user.is_active and condition(user)
+        }
+
+    def test_nested_filter(self):
+        cases = [
+            ({}, lambda u: True),
+            (
+                {"filter_f0-username": "user1"},
+                lambda u: "user1" in u.username,
+            ),
+            (
+                {
+                    "filter_f0-email": "b.org",
+                    "filter_f00-first_name": "ann",
+                    "filter_f00-last_name": "smith",
+                },
+                lambda u: "b.org" in u.email
+                or (u.first_name == "Ann" and u.last_name == "Smith"),
+            ),
+            (
+                {"filter_f0-username": "user1", "filter_f0-groups": self.group.pk},
+                lambda u: "user1" in u.username or u.username.endswith("3"),
+            ),
+        ]
+        for params, condition in cases:
+            params["filter_f-is_active"] = "true"
+            queryset = self.filter(**params)
+            # the whole filter tree is a single WHERE clause without subqueries
+            self.assertEqual(str(queryset.query).count("SELECT"), 1, params)
+            self.assertEqual(
+                set(queryset.values_list("pk", flat=True)),
+                self.expected(condition),
+                params,
+            )
+
+    def test_multivalued_and(self):
+        alpha = Group.objects.create(name="alpha")
+        beta = Group.objects.create(name="beta")
+        alpha.user_set.add(User.objects.get(username="user1"))
+        beta.user_set.add(User.objects.get(username="user1"))
+        beta.user_set.add(User.objects.get(username="user2"))
+        params = {"filter_f-groups__name": "beta", "filter_f-groups__id": alpha.pk}
+
+        # like chained filter() calls, the conditions may match different groups
+        filterset = parse_filterconfig(User, ("and", "groups__name", "groups__id"), "f")
+        queryset = filterset(
+            QueryDict(urlencode(params)), queryset=User.objects.all()
+        ).qs
+        self.assertEqual(list(queryset.values_list("username", flat=True)), ["user1"])
+        self.assertEqual(
+            set(queryset),
+            set(User.objects.filter(groups__name="beta").filter(groups=alpha)),
+        )
+        # a single filter() would need one group which matches both conditions
+        self.assertFalse(User.objects.filter(groups__name="beta", groups=alpha))
+
+        # the same inside of an or-group
+        filterset = parse_filterconfig(
+            User, ("or", "email", ("and", "groups__name", "groups__id")), "f"
+        )
+        queryset = filterset(
+            QueryDict(
+                urlencode(
+                    {
+                        "filter_f-email": "user7@",
+                        "filter_f0-groups__name": "beta",
+                        "filter_f0-groups__id": alpha.pk,
+                    }
+                )
+            ),
+            queryset=User.objects.all(),
+        ).qs
+        self.assertEqual(
+            sorted(queryset.values_list("username", flat=True)), ["user1", "user7"]
+        )
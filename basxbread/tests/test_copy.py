@@ -0,0 +1,99 @@
+from django.contrib.auth.models import Group, User
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..contrib.reports.models import Report, ReportColumn
+from ..views.edit import bulkcopy, deepcopy_object, deepcopy_objects
+
+
+class DeepcopyTest(TestCase):
+    def setUp(self):
+        contenttype = ContentType.objects.get_for_model(User)
+        for i in range(50):
+            report = Report.objects.create(
+                name=f"report{i}", model=contenttype, filter="is_active = True"
+            )
+            for j in range(3):
+                report.columns.create(header=f"header{j}", column="username")
+
+    def test_deepcopy_objects(self):
+        with CaptureQueriesContext(connection) as queries:
+            copies = deepcopy_objects(
+                Report.objects.order_by("pk"),
+                copy_related_fields=("columns",),
+                labelfield="name",
+            )
+        # select, insert reports, select columns, insert columns (maybe in
+        # more than one batch), savepoint
+        self.assertLessEqual(len(queries), 8)
+        self.assertEqual(Report.objects.count(), 100)
+        self.assertEqual(ReportColumn.objects.count(), 300)
+        self.assertEqual(copies[1].name, "report1 (Copy)")
+        self.assertEqual(str(copies[1].filter), "is_active = True")
+        self.assertEqual(
+            list(copies[1].columns.values_list("header", flat=True)),
+            ["header0", "header1", "header2"],
+        )
+
+    def test_manytomany(self):
+        groups = [Group.objects.create(name=f"group{i}") for i in range(3)]
+        user = User.objects.create(username="user")
+        user.groups.set(groups)
+        copy = deepcopy_object(user, {"username": "copy"})
+        self.assertEqual(set(copy.groups.all()), set(groups))
+        self.assertEqual(set(user.groups.all()), set(groups))
+        copy = deepcopy_object(user, {"username": "copy2", "groups": groups[:1]})
+        self.assertEqual(list(copy.groups.all()), groups[:1])
+
+    def saved_objects(self):
+        saved = []
+
+        def receiver(sender, instance, created, **kwargs):
+            if created:
+                saved.append(instance)
+
+        post_save.connect(receiver, weak=False)
+        self.addCleanup(post_save.disconnect, receiver)
+        return saved
+
+    def test_deepcopy_object_saves(self):
+        saved = self.saved_objects()
+        report = Report.objects.get(name="report1")
+        copy = deepcopy_object(
+            report, {"name": "copy"}, copy_related_fields=("columns",)
+        )
+        self.assertEqual(
+            [type(obj) for obj in saved],
+            [Report, ReportColumn, ReportColumn, ReportColumn],
+        )
+        self.assertEqual(saved[0], copy)
+        self.assertEqual(copy.columns.count(), 3)
+
+    def test_bulkcopy(self):
+        request = RequestFactory().get("/")
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        saved = self.saved_objects()
+        queryset = Report.objects.filter(name__in=["report1", "report2"])
+
+        bulkcopy(request, queryset, labelfield="name", copy_related_fields=("columns",))
+        self.assertEqual(saved, [])
+        self.assertEqual(ReportColumn.objects.count(), 156)
+
+        bulkcopy(
+            request,
+            queryset,
+            labelfield="name",
+            copy_related_fields=("columns",),
+            send_signals=True,
+        )
+        self.assertEqual(
+            sorted(obj.name for obj in saved if isinstance(obj, Report)),
+            ["report1 (Copy)", "report2 (Copy)"],
+        )
+        self.assertEqual(len(saved), 8)
+        self.assertEqual(ReportColumn.objects.count(), 162)
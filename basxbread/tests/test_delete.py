@@ -0,0 +1,173 @@
+from django.contrib.auth.models import Permission, User
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.db.models.signals import post_save, pre_delete
+from django.test import RequestFactory, TestCase, override_settings
+
+from ..contrib.taxonomy.models import Term, Vocabulary
+from ..views.browse import delete, restore
+
+
+class OwnTermsBackend:
+    """Allows to delete the terms which start with the username"""
+
+    def authenticate(self, request, **credentials):
+        return None
+
+    def has_perm(self, user, perm, obj=None):
+        return (
+            perm == "taxonomy.delete_term"
+            and isinstance(obj, Term)
+            and obj.term.startswith(user.username)
+        )
+
+
+class DeleteTest(TestCase):
+    def setUp(self):
+        self.vocabulary = Vocabulary.objects.create(name="colors", slug="colors")
+        other = Vocabulary.objects.create(name="other", slug="other")
+        for name in ("ann-red", "ann-blue", "bob-red", "bob-green"):
+            Term.objects.create(vocabulary=self.vocabulary, term=name)
+        Term.objects.create(vocabulary=other, term="ann-other")
+        self.deleter = User.objects.create(username="ann")
+        self.deleter.user_permissions.add(
+            Permission.objects.get(codename="delete_term")
+        )
+        self.nobody = User.objects.create(username="bob")
+        self.admin = User.objects.create(username="admin", is_superuser=True)
+        # a browse view queryset with a join, ordering and distinct
+        self.selected = (
+            Term.objects.including_disabled()
+            .filter(vocabulary__name="colors")
+            .order_by("-term")
+            .distinct()
+        )
+
+    def request(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def messages(self, request):
+        return [(m.level_tag, str(m)) for m in get_messages(request)]
+
+    def terms(self, **filter):
+        return sorted(
+            Term.objects.including_disabled()
+            .filter(**filter)
+            .values_list("term", flat=True)
+        )
+
+    def test_delete_with_model_permissions(self):
+        request = self.request(self.deleter)
+        delete(request, self.selected)
+        self.assertEqual(self.terms(), ["ann-other"])
+        self.assertEqual(self.messages(request), [("success", "Deleted 4 Terms")])
+
+    def test_delete_without_permissions(self):
+        for object_permissions in (False, True):
+            request = self.request(self.nobody)
+            delete(request, self.selected, object_permissions=object_permissions)
+            self.assertEqual(len(self.terms()), 5)
+            self.assertEqual(
+                self.messages(request),
+                [("error", "Your user has not the permissions to delete Terms")],
+            )
+
+    @override_settings(
+        AUTHENTICATION_BACKENDS=[
+            "django.contrib.auth.backends.ModelBackend",
+            "basxbread.tests.test_delete.OwnTermsBackend",
+        ]
+    )
+    def test_object_permissions(self):
+        request = self.request(self.nobody)
+        delete(request, self.selected)
+        self.assertEqual(len(self.terms()), 5)
+        self.assertEqual(self.messages(request)[0][0], "error")
+
+        request = self.request(self.nobody)
+        delete(request, self.selected, object_permissions=True)
+        self.assertEqual(self.terms(), ["ann-blue", "ann-other", "ann-red"])
+        self.assertEqual(self.messages(request), [("success", "Deleted 2 Terms")])
+
+    def test_soft_delete_and_restore(self):
+        Term.objects.filter(term="bob-green").update(disabled=True)
+        saved = []
+
+        def receiver(sender, instance, **kwargs):
+            saved.append(instance.term)
+
+        post_save.connect(receiver, sender=Term)
+        self.addCleanup(post_save.disconnect, receiver, sender=Term)
+
+        request = self.request(self.admin)
+        with self.assertNumQueries(1):
+            delete(request, self.selected, softdeletefield="disabled")
+        self.assertEqual(saved, [])
+        self.assertEqual(
+            self.terms(disabled=True), ["ann-blue", "ann-red", "bob-green", "bob-red"]
+        )
+        self.assertEqual(self.messages(request), [("success", "Deleted 3 Terms")])
+
+        request = self.request(self.admin)
+        with self.assertNumQueries(1):
+            restore(request, self.selected.filter(term__startswith="ann"), "disabled")
+        self.assertEqual(self.terms(disabled=True), ["bob-green", "bob-red"])
+        self.assertEqual(self.messages(request), [("success", "Restored 2 Terms")])
+
+    def test_soft_delete_send_signals(self):
+        saved = []
+
+        def receiver(sender, instance, **kwargs):
+            saved.append((instance.term, instance.disabled))
+
+        post_save.connect(receiver, sender=Term)
+        self.addCleanup(post_save.disconnect, receiver, sender=Term)
+
+        delete(
+            self.request(self.admin),
+            self.selected,
+            softdeletefield="disabled",
+            send_signals=True,
+        )
+        self.assertEqual(
+            sorted(saved),
+            [
+                ("ann-blue", True),
+                ("ann-red", True),
+                ("bob-green", True),
+                ("bob-red", True),
+            ],
+        )
+        saved.clear()
+        restore(
+            self.request(self.admin),
+            self.selected.filter(term="ann-red"),
+            "disabled",
+            send_signals=True,
+        )
+        self.assertEqual(saved, [("ann-red", False)])
+
+    def test_rollback_if_a_batch_fails(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            if instance.term == "bob-green":
+                raise ValueError("not allowed")
+            deleted.append(instance.term)
+
+        pre_delete.connect(receiver, sender=Term)
+        self.addCleanup(pre_delete.disconnect, receiver, sender=Term)
+
+        request = self.request(self.admin)
+        delete(request, self.selected, batch_size=2)
+        # the first batch (in order of the pks) had been deleted before the error
+        self.assertLessEqual({"ann-red", "ann-blue"}, set(deleted))
+        self.assertEqual(len(self.terms()), 5)
+        self.assertEqual(
+            self.messages(request),
+            [("error", "Terms could not be deleted: not allowed")],
+        )
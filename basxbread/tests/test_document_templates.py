@@ -0,0 +1,125 @@
+import io
+import tempfile
+import zipfile
+from unittest import mock
+
+import docx
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, TestCase, override_settings
+from docxtpl import DocxTemplate
+
+from ..contrib.document_templates.models import DocumentTemplate
+from ..contrib.document_templates.views import generate_documents
+from ..utils import jinja_cache_info
+
+
+def document_text(content):
+    return "\n".join(p.text for p in docx.Document(io.BytesIO(content)).paragraphs)
+
+
+def document_header_and_title(content):
+    document = docx.Document(io.BytesIO(content))
+    return (
+        document.sections[0].header.paragraphs[0].text,
+        document.core_properties.title,
+    )
+
+
+class GenerateDocumentsTest(TestCase):
+    def setUp(self):
+        self.mediaroot = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.mediaroot.name)
+        self.settings.enable()
+        document = docx.Document()
+        document.add_paragraph("Hello {{ name }}")
+        document.sections[0].header.paragraphs[0].text = "To {{ name }}"
+        document.core_properties.title = "Letter to {{ name }}"
+        buf = io.BytesIO()
+        document.save(buf)
+        self.template = DocumentTemplate(
+            name="letter",
+            model=ContentType.objects.get_for_model(User),
+            filename_template="{{ username }}",
+        )
+        self.template.file.save("letter.docx", ContentFile(buf.getvalue()), save=False)
+        self.template.save()
+        self.template.variables.update_or_create(
+            name="name", defaults={"value": "username"}
+        )
+        User.objects.bulk_create(User(username=f"user{i}") for i in range(5))
+
+    def tearDown(self):
+        self.settings.disable()
+        self.mediaroot.cleanup()
+
+    def request(self, **params):
+        request = RequestFactory().get("/", params)
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def test_zip(self):
+        response = generate_documents(
+            self.request(), User.objects.filter(username__in=["user1", "user2"])
+        )
+        self.assertEqual(response["Content-Type"], "application/zip")
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as z:
+            self.assertEqual(sorted(z.namelist()), ["user1.docx", "user2.docx"])
+            self.assertEqual(document_text(z.read("user2.docx")), "Hello user2")
+
+    def test_select_template(self):
+        users = User.objects.filter(username="user1")
+        response = generate_documents(
+            self.request(document_template=self.template.pk), users
+        )
+        self.assertEqual(response["Content-Type"], "application/zip")
+        for value in (self.template.pk + 1, "abc", ""):
+            request = self.request(document_template=value)
+            self.assertIsNone(generate_documents(request, users))
+            self.assertEqual(
+                [str(m) for m in get_messages(request)],
+                ["Please select a single document template"],
+            )
+
+    def test_same_result_as_single_documents(self):
+        users = list(User.objects.order_by("pk"))
+        for processes in (1, 2):
+            documents = list(self.template.generate_documents(users, processes))
+            self.assertEqual(
+                [filename for filename, content in documents],
+                [f"{user.username}.docx" for user in users],
+            )
+            self.assertEqual(
+                [document_text(content) for filename, content in documents],
+                [f"Hello {user.username}" for user in users],
+            )
+            self.assertEqual(
+                [document_header_and_title(content) for filename, content in documents],
+                [(f"To {u.username}", f"Letter to {u.username}") for u in users],
+            )
+            self.assertEqual(
+                document_text(documents[0][1]),
+                document_text(self.template.render_with(users[0]).getvalue()),
+            )
+
+    @mock.patch("basxbread.utils.jinja2.JINJA_TEMPLATE_CACHE_MAX_LENGTH", 10)
+    def test_templates_are_cached(self):
+        users = list(User.objects.order_by("pk"))
+        list(self.template.generate_documents(users[:1], 1))
+        misses = jinja_cache_info().misses
+        with mock.patch(
+            "basxbread.contrib.document_templates.models.DocxTemplate.patch_xml",
+            autospec=True,
+            side_effect=DocxTemplate.patch_xml,
+        ) as patch_xml, mock.patch(
+            "docxtpl.template.Document", wraps=docx.Document
+        ) as parse:
+            list(self.template.generate_documents(users, 1))
+        self.assertEqual(jinja_cache_info().misses, misses)
+        # once for each template or part of it, not for each document
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(patch_xml.call_count, 2)
@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+import tempfile
+from unittest import mock
+
+import openpyxl
+from django.contrib.auth.models import Permission, User
+from django.core.files.storage import default_storage
+from django.http import StreamingHttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django_celery_results.models import TaskResult
+
+from ..tasks import export_browseview
+from ..utils.urls import reverse_model
+from ..views.browse import export, export_csv, export_jsonlines
+
+
+class ExportTest(TestCase):
+    columns = ["username", "first_name", "is_active"]
+
+    def setUp(self):
+        User.objects.create(username="ann", first_name='Ann, "the" <b>first</b>')
+        User.objects.bulk_create(User(username=f"user{i:03d}") for i in range(300))
+        self.request = RequestFactory().get("/")
+        self.queryset = User.objects.order_by("username")
+
+    def test_excel_streaming(self):
+        response = export(self.queryset, self.columns, self.request, streaming=True)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn('filename="user.xlsx"', response["Content-Disposition"])
+
+        workbook = openpyxl.load_workbook(io.BytesIO(b"".join(response)))
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[0], ("username", "first name", "active"))
+        self.assertEqual(rows[1][:2], ("ann", 'Ann, "the" <b>first</b>'))
+        self.assertEqual(rows[-1][0], "user299")
+        self.assertEqual(len(rows), 302)
+        self.assertEqual(workbook.active.auto_filter.ref, "A1:C1")
+
+    def test_excel_streaming_same_as_excel(self):
+        values = []
+        for streaming in (False, True):
+            response = export(self.queryset, self.columns, self.request, streaming)
+            content = b"".join(response) if streaming else response.content
+            values.append(
+                list(openpyxl.load_workbook(io.BytesIO(content)).active.values)
+            )
+        self.assertEqual(values[0], values[1])
+
+    def test_csv(self):
+        response = export_csv(self.queryset, self.columns, self.request)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="user.csv"', response["Content-Disposition"])
+
+        content = b"".join(response.streaming_content).decode()
+        self.assertTrue(
+            content.startswith(
+                'username,first name,active\r\nann,"Ann, ""the"" <b>first</b>",'
+            )
+        )
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[1][:2], ["ann", 'Ann, "the" <b>first</b>'])
+        self.assertEqual(rows[-1][0], "user299")
+        self.assertEqual(len(rows), 302)
+
+    def test_jsonlines(self):
+        response = export_jsonlines(self.queryset, self.columns, self.request)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn('filename="user.jsonl"', response["Content-Disposition"])
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 301)
+        first = json.loads(lines[0])
+        self.assertEqual(list(first), ["username", "first name", "active"])
+        self.assertEqual(first["first name"], 'Ann, "the" <b>first</b>')
+        self.assertEqual(json.loads(lines[-1])["username"], "user299")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class BackgroundExportTest(TestCase):
+    def setUp(self):
+        User.objects.bulk_create(User(username=f"user{i:02d}") for i in range(30))
+        self.owner = User.objects.create(username="owner")
+        self.owner.user_permissions.add(Permission.objects.get(codename="view_user"))
+        self.url = str(reverse_model(User, "browse"))
+
+    def export(self, querystring, format):
+        with mock.patch.object(export_browseview, "update_state") as update_state:
+            result = export_browseview.apply(
+                (self.url, querystring, self.owner.pk, format), task_id="task"
+            ).get()
+        update_state.assert_called()
+        self.addCleanup(default_storage.delete, result["filename"])
+        return result
+
+    def test_export_browseview(self):
+        result = self.export("q=user1&ordering=-username", "csv")
+        self.assertEqual(result["user"], self.owner.pk)
+        self.assertEqual(result["rows"], 10)
+        self.assertTrue(result["filename"].startswith("exports/task/"))
+        with default_storage.open(result["filename"]) as f:
+            rows = list(csv.reader(io.StringIO(f.read().decode())))
+        self.assertEqual(len(rows), 11)
+        username = rows[0].index("username")
+        self.assertEqual(rows[1][username], "user19")
+        self.assertEqual(rows[-1][username], "user10")
+
+    def test_export_browseview_permission(self):
+        nobody = User.objects.create(username="nobody")
+        with self.assertRaises(PermissionError):
+            export_browseview.apply(
+                (self.url, "", nobody.pk, "csv"), task_id="task", throw=True
+            )
+        with self.assertRaises(ValueError):
+            export_browseview.apply(
+                (self.url, "", self.owner.pk, "pdf"), task_id="task", throw=True
+            )
+
+    def test_export_download(self):
+        result = self.export("", "jsonl")
+        TaskResult.objects.create(
+            task_id="task",
+            task_name=export_browseview.name,
+            status="SUCCESS",
+            result=json.dumps(result),
+        )
+        url = reverse("exportdownload", kwargs={"task_id": "task"})
+        client = Client()
+
+        client.force_login(self.owner)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 31)
+
+        client.force_login(User.objects.create(username="other"))
+        self.assertEqual(client.get(url).status_code, 403)
+
+        client.force_login(User.objects.create(username="admin", is_superuser=True))
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(
+            client.get(reverse("exportdownload", kwargs={"task_id": "x"})).status_code,
+            404,
+        )
@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase
+
+from ..utils import jinja_cache_info, jinja_render, jinja_template
+
+
+class JinjaTemplateCacheTest(SimpleTestCase):
+    def test_compiled_once(self):
+        source = "{{ value|map({'a': 'A'}) }}-{{ object }}"
+        before = jinja_cache_info()
+        for i in range(100):
+            self.assertEqual(jinja_render(source, value="a", object=i), f"A-{i}")
+        after = jinja_cache_info()
+        self.assertEqual(after.misses - before.misses, 1)
+        self.assertEqual(after.hits - before.hits, 99)
+        self.assertLessEqual(after.currsize, after.maxsize)
+        self.assertIs(jinja_template(source), jinja_template(source))
+
+    def test_sandboxed(self):
+        with self.assertRaises(Exception):
+            jinja_render("{{ value.__class__.__subclasses__() }}", value=1)
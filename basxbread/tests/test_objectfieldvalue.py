@@ -0,0 +1,53 @@
+from django.contrib.auth.models import Group, User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+
+from ..contrib.reports.models import Report
+from ..contrib.triggers.models import Action, DataChangeTrigger, SendEmail
+from ..layout.utils import ObjectFieldValue, compile_fieldaccessor
+
+
+class CompiledFieldAccessorTest(TestCase):
+    def setUp(self):
+        contenttype = ContentType.objects.get_for_model(User)
+        self.action = SendEmail.objects.create(
+            description="action", model=contenttype, email="a@example.com"
+        )
+        self.trigger = DataChangeTrigger.objects.create(
+            description="trigger", model=contenttype, type="changed", action=self.action
+        )
+        self.trigger_noaction = DataChangeTrigger.objects.create(
+            description="trigger", model=contenttype, type="added"
+        )
+        self.report = Report.objects.create(name="report", model=contenttype)
+        self.report.columns.create(header="header", column="username")
+        self.user = User.objects.create(username="user")
+        self.user.groups.add(Group.objects.create(name="group"))
+
+    def test_same_value_as_generic_lookup(self):
+        cases = [
+            (self.trigger, "type"),
+            (self.trigger, "action"),
+            (self.trigger, "action.description"),
+            (self.trigger_noaction, "action.description"),
+            (self.trigger, "model.app_label"),
+            (self.trigger, "enable"),
+            (self.report, "columns"),
+            (self.report, "created"),
+            (self.user, "groups"),
+            (self.user, "last_login"),
+            (Action.objects.get(pk=self.action.pk), "sendemail.email"),
+            (self.report.columns.first(), "report.name"),
+        ]
+        for obj, fieldname in cases:
+            accessor = compile_fieldaccessor(type(obj), fieldname)
+            self.assertIsNotNone(accessor, fieldname)
+            self.assertEqual(
+                accessor(obj),
+                ObjectFieldValue(fieldname, "row")._resolve_generic(obj),
+                fieldname,
+            )
+
+    def test_not_compiled(self):
+        self.assertIsNone(compile_fieldaccessor(User, "get_full_name"))
+        self.assertIsNone(compile_fieldaccessor(Report, "columns.header"))
@@ -0,0 +1,63 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+from django.test import TestCase
+from django.utils import timezone
+
+from ..layout.components.pagination import KeysetPaginator
+
+
+class KeysetPaginatorTest(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        for i in range(23):
+            User.objects.create(
+                username=f"user{i:02d}",
+                first_name=["a", "B", "c", ""][i % 4],
+                last_login=(
+                    None
+                    if i % 3 == 0
+                    else now - datetime.timedelta(days=i % 2, microseconds=i)
+                ),
+            )
+
+    def pages(self, queryset, cursor=None, backwards=False):
+        ret = []
+        while True:
+            page = KeysetPaginator(queryset, 5, cursor).current_page
+            ret.append((cursor, [user.pk for user in page]))
+            if not (page.has_previous() if backwards else page.has_next()):
+                return ret
+            cursor = page.previous_cursor if backwards else page.next_cursor
+
+    def test_all_objects_in_order(self):
+        for ordering in [
+            ("username",),
+            ("-username",),
+            (Lower("first_name").desc(),),
+            ("last_login",),
+            ("first_name", "-last_login"),
+        ]:
+            queryset = User.objects.order_by(*ordering)
+            expected = [user.pk for user in KeysetPaginator(queryset, 100).current_page]
+            self.assertEqual(len(expected), 23)
+
+            forward = self.pages(queryset)
+            self.assertEqual(len(forward), 5)
+            self.assertEqual([pk for _, page in forward for pk in page], expected)
+
+            backward = self.pages(queryset, forward[-1][0], backwards=True)
+            self.assertEqual(
+                [pk for _, page in reversed(backward) for pk in page], expected
+            )
+
+    def test_invalid_cursor(self):
+        queryset = User.objects.order_by("username")
+        cursor = KeysetPaginator(queryset, 5).current_page.next_cursor
+        for invalid in ["garbage", cursor[:-3]]:
+            page = KeysetPaginator(queryset, 5, invalid).current_page
+            self.assertFalse(page.has_previous())
+        # cursors of a different ordering start on the first page
+        page = KeysetPaginator(User.objects.order_by("-pk"), 5, cursor).current_page
+        self.assertEqual(page.object_list[0], User.objects.order_by("-pk").first())
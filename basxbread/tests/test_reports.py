@@ -0,0 +1,265 @@
+import io
+from unittest import mock
+
+import openpyxl
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from django.forms import inlineformset_factory
+from django.test import Client, RequestFactory, TestCase
+
+from ..contrib.reports.models import Report, ReportColumn
+from ..contrib.reports.tasks import refresh_report_snapshot
+from ..contrib.reports.views import ReadView
+from ..utils import statement_timeout
+from ..utils.urls import reverse_model
+from .helper import authenticate
+
+
+class ReportAggregationTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        authenticate(self.client)
+        group = Group.objects.create(name="group")
+        for i in range(30):
+            User.objects.create(
+                username=f"user{i:02}", email=f"user{i}@example.com" if i % 3 else ""
+            ).groups.add(group)
+        self.report = Report.objects.create(
+            name="report",
+            model=ContentType.objects.get_for_model(User),
+            filter='username ~ "user"',
+        )
+        self.report.columns.create(header="Username", column="username")
+        self.report.columns.create(header="Email", column="email", aggregation="count")
+        self.report.columns.create(header="Id", column="id", aggregation="sum")
+        self.report.columns.create(
+            header="Groups", column="groups.name", aggregation="count"
+        )
+        self.report.columns.create(
+            header="Name", column="get_full_name", aggregation="sum"
+        )
+        self.users = User.objects.filter(username__startswith="user")
+        Group.objects.create(name="other").user_set.add(*self.users[:10])
+
+    def test_aggregate(self):
+        columns = list(self.report.columns.all())
+        with self.assertNumQueries(2):  # groups.name is multi-valued
+            totals = self.report.aggregate(self.report.queryset, columns)
+        self.assertEqual(
+            totals,
+            [None, 30, sum(self.users.values_list("id", flat=True)), 40, None],
+        )
+        self.assertIsNone(self.report.aggregate(self.report.queryset, columns[:1]))
+
+    def test_sum_only_numeric_fields(self):
+        column = self.report.columns.create(
+            header="Username", column="username", aggregation="sum"
+        )
+        self.assertIsNone(column.aggregate_expression(User))
+        totals = self.report.aggregate(self.report.queryset, [column])
+        self.assertIsNone(totals)
+        with self.assertRaises(ValidationError):
+            column.full_clean()
+        column.column = "id"
+        column.full_clean()
+
+        ColumnFormset = inlineformset_factory(
+            Report, ReportColumn, fields=["header", "column", "aggregation"], extra=1
+        )
+        formset = ColumnFormset(
+            {
+                "columns-TOTAL_FORMS": "1",
+                "columns-INITIAL_FORMS": "0",
+                "columns-0-header": "Email",
+                "columns-0-column": "email",
+                "columns-0-aggregation": "sum",
+            },
+            instance=self.report,
+        )
+        self.assertFalse(formset.is_valid())
+        self.assertIn("aggregation", formset.errors[0])
+
+    def test_footer(self):
+        response = self.client.get(
+            reverse_model(Report, "read", kwargs={"pk": self.report.pk})
+        )
+        self.assertContains(response, "<tfoot")
+
+        response = self.client.get(
+            reverse_model(Report, "excel", kwargs={"pk": self.report.pk})
+        )
+        worksheet = openpyxl.load_workbook(io.BytesIO(response.content)).active
+        self.assertEqual(worksheet.max_row, 32)
+        self.assertEqual(
+            [cell.value for cell in worksheet[32]][1:4],
+            [30, sum(self.users.values_list("id", flat=True)), 40],
+        )
+
+    def test_snapshot(self):
+        self.report.use_snapshot = True
+        self.report.save()
+        readurl = reverse_model(Report, "read", kwargs={"pk": self.report.pk})
+        self.assertContains(self.client.get(readurl), "No snapshot")
+
+        snapshot = self.report.refresh_snapshot()
+        self.assertEqual(snapshot.rows.count(), 30)
+        self.assertEqual(snapshot.headers[:2], ["Username", "Email"])
+        self.assertEqual(snapshot.totals[1], "30")
+
+        # the snapshot is displayed until it is refreshed
+        self.users.filter(username__gte="user20").delete()
+        response = self.client.get(readurl)
+        self.assertContains(response, "user29")
+        self.assertContains(response, "<tfoot")
+        worksheet = openpyxl.load_workbook(
+            io.BytesIO(
+                self.client.get(
+                    reverse_model(Report, "excel", kwargs={"pk": self.report.pk})
+                ).content
+            )
+        ).active
+        self.assertEqual(worksheet.max_row, 32)
+
+        with mock.patch.object(refresh_report_snapshot, "apply_async") as apply_async:
+            response = self.client.post(
+                reverse_model(Report, "refreshsnapshot", kwargs={"pk": self.report.pk})
+            )
+        self.assertRedirects(response, readurl, fetch_redirect_response=False)
+        apply_async.assert_called_once_with((self.report.pk,))
+        self.assertEqual(self.report.refresh_snapshot().rows.count(), 20)
+
+
+class ReportReadViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        authenticate(self.client)
+        User.objects.bulk_create(User(username=f"user{i:02}") for i in range(30))
+        self.report = Report.objects.create(
+            name="report",
+            model=ContentType.objects.get_for_model(User),
+            filter='username ~ "user"',
+        )
+        self.report.columns.create(header="Username", column="username")
+        self.report.columns.create(header="Id", column="id")
+        self.url = reverse_model(Report, "read", kwargs={"pk": self.report.pk})
+
+    def rows(self, response):
+        return response.content.decode().count("<tr") - 1  # without header
+
+    def test_ordering(self):
+        view = ReadView(model=Report)
+        view.object = self.report
+        view.request = RequestFactory().get(self.url, {"ordering": "-id"})
+        sql = str(view.get_queryset_for_report(list(self.report.columns.all())).query)
+        self.assertNotIn("LOWER", sql)
+        view.request = RequestFactory().get(self.url, {"ordering": "username"})
+        sql = str(view.get_queryset_for_report(list(self.report.columns.all())).query)
+        self.assertIn("LOWER", sql)
+        view.request = RequestFactory().get(self.url, {"ordering": "nofield"})
+        view.get_queryset_for_report([])
+
+    @mock.patch("basxbread.contrib.reports.views.REPORT_MAX_ROWS", 20)
+    @mock.patch("basxbread.contrib.reports.views.REPORT_ROWS_STEP", 10)
+    def test_load_more(self):
+        response = self.client.get(self.url)
+        self.assertEqual(self.rows(response), 10)
+        self.assertContains(response, "limit=20")
+        response = self.client.get(self.url, {"limit": 1000})
+        self.assertEqual(self.rows(response), 20)
+        self.assertContains(response, "Only the first 20 rows")
+
+        self.report.pagination = 7
+        self.report.save()
+        response = self.client.get(self.url, {"page": 5})
+        self.assertEqual(self.rows(response), 2)
+
+    @mock.patch("basxbread.contrib.reports.views.REPORT_MAX_ROWS", 20)
+    @mock.patch("basxbread.contrib.reports.views.REPORT_ROWS_STEP", 10)
+    def test_load_more_snapshot(self):
+        self.report.use_snapshot = True
+        self.report.save()
+        self.report.refresh_snapshot()
+        response = self.client.get(self.url)
+        self.assertEqual(self.rows(response), 10)
+        self.assertContains(response, "limit=20")
+        self.assertContains(response, "30 users")
+        response = self.client.get(self.url, {"limit": 1000})
+        self.assertEqual(self.rows(response), 20)
+        self.assertContains(response, "Only the first 20 rows")
+
+        self.report.pagination = 7
+        self.report.save()
+        response = self.client.get(self.url, {"page": 5})
+        self.assertEqual(self.rows(response), 2)
+
+
+class ReportPreviewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        authenticate(self.client)
+        User.objects.bulk_create(User(username=f"user{i:02}") for i in range(30))
+        self.report = Report.objects.create(
+            name="report",
+            model=ContentType.objects.get_for_model(User),
+            filter='username ~ "user"',
+        )
+        self.column = self.report.columns.create(header="Username", column="username")
+
+    def test_cached(self):
+        headers, rows = self.report.preview()
+        self.assertEqual(headers, ["Username"])
+        self.assertEqual(len(rows), 10)
+        self.column.header = "Name"
+        self.column.save()
+        with self.assertNumQueries(1):  # only the columns
+            headers, cachedrows = self.report.preview()
+        self.assertEqual(headers, ["Name"])
+        self.assertEqual(rows, cachedrows)
+        self.column.column = "id"
+        self.column.save()
+        with self.assertNumQueries(2):
+            self.report.preview()
+
+    def test_view(self):
+        response = self.client.get(
+            reverse_model(Report, "edit", kwargs={"pk": self.report.pk})
+        )
+        self.assertNotContains(response, "user00")
+        self.assertContains(response, 'hx-trigger="load"')
+        response = self.client.get(
+            reverse_model(Report, "preview", kwargs={"pk": self.report.pk}),
+            {settings.AJAX_URLPARAMETER: True},
+        )
+        self.assertContains(response, "user00")
+        self.assertNotContains(response, "<html")
+
+    def test_permission(self):
+        url = reverse_model(Report, "preview", kwargs={"pk": self.report.pk})
+        client = Client()
+        user = User.objects.create(username="nobody")
+        client.force_login(user)
+        response = client.get(url, {settings.AJAX_URLPARAMETER: True})
+        self.assertNotEqual(response.status_code, 200)
+        self.assertNotContains(response, "user00", status_code=response.status_code)
+
+        for codename in ("view_report", "change_report"):
+            user.user_permissions.set([Permission.objects.get(codename=codename)])
+            response = client.get(url, {settings.AJAX_URLPARAMETER: True})
+            self.assertContains(response, "user00")
+
+    def test_statement_timeout(self):
+        query = (
+            "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c "
+            "WHERE x < 100000000) SELECT count(*) FROM c"
+        )
+        with self.assertRaises(OperationalError):
+            with statement_timeout(0.01):
+                with connection.cursor() as cursor:
+                    cursor.execute(query)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
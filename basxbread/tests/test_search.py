@@ -0,0 +1,154 @@
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.utils.translation import override
+from haystack import connections as haystack_connections
+from haystack import indexes
+
+from .. import views
+from ..utils import queryset_from_fields
+
+
+class SearchQueryTest(TestCase):
+    def setUp(self):
+        self.fields = [*User._meta.fields, *User._meta.many_to_many]
+        User.objects.create(username="alice", first_name="Alice")
+        bob = User.objects.create(username="bob")
+        bob.groups.add(Group.objects.create(name="Administrators"))
+
+    def search(self, query, follow_relationships=1):
+        return set(
+            User.objects.filter(
+                queryset_from_fields.get_field_queryset(
+                    self.fields, query, follow_relationships=follow_relationships
+                )
+            ).values_list("username", flat=True)
+        )
+
+    def test_search(self):
+        self.assertEqual(self.search("lic"), {"alice"})
+        self.assertEqual(self.search("Admin"), {"bob"})
+        self.assertEqual(self.search("Admin", follow_relationships=0), set())
+
+    def test_country_index_per_language(self):
+        with override("en"):
+            self.assertIn("DE", queryset_from_fields._matching_countries("germany"))
+        with override("de"):
+            self.assertIn("DE", queryset_from_fields._matching_countries("deutschland"))
+            self.assertNotIn("DE", queryset_from_fields._matching_countries("germany"))
+
+    def test_lookups_are_cached(self):
+        queryset_from_fields._search_lookups.cache_clear()
+        queryset_from_fields._country_index.cache_clear()
+        uncached = queryset_from_fields.get_field_queryset(
+            self.fields, "query", follow_relationships=2
+        )
+        misses = queryset_from_fields._search_lookups.cache_info().misses
+        self.assertGreater(misses, 1)  # one per model and depth
+
+        with self.assertNumQueries(0):
+            cached = queryset_from_fields.get_field_queryset(
+                self.fields, "other", follow_relationships=2
+            )
+        info = queryset_from_fields._search_lookups.cache_info()
+        self.assertEqual(info.misses, misses)
+        self.assertGreaterEqual(info.hits, 1)
+        self.assertEqual(str(cached), str(uncached).replace("query", "other"))
+
+    def test_country_index_is_cached(self):
+        queryset_from_fields._country_index.cache_clear()
+        with override("en"):
+            queryset_from_fields._matching_countries("germany")
+            queryset_from_fields._matching_countries("france")
+        with override("de"):
+            queryset_from_fields._matching_countries("deutschland")
+        info = queryset_from_fields._country_index.cache_info()
+        self.assertEqual((info.misses, info.hits), (2, 1))
+
+
+class UserIndex(indexes.SearchIndex, indexes.Indexable):
+    text = indexes.CharField(document=True, model_attr="username")
+
+    def get_model(self):
+        return User
+
+
+class SearchBackendTest(TestCase):
+    def setUp(self):
+        User.objects.create(username="alice", first_name="Alice")
+        bob = User.objects.create(username="bob", email="bob@example.com")
+        bob.groups.add(
+            Group.objects.create(name="Administrators"),
+            Group.objects.create(name="Admins"),
+        )
+        User.objects.create(username="carol", last_name="Bobson")
+
+    def search(self, query, backend="database", fields=None):
+        return queryset_from_fields.search_queryset(
+            User.objects.all(), query, backend, fields
+        )
+
+    def usernames(self, queryset):
+        return sorted(queryset.values_list("username", flat=True))
+
+    def test_database(self):
+        self.assertEqual(self.usernames(self.search("bob")), ["bob", "carol"])
+        # matches two groups of the same user but returns the user once
+        self.assertEqual(self.usernames(self.search("admin")), ["bob"])
+        with self.assertRaises(ValueError):
+            self.search("bob", backend="elasticsearch")
+
+    def test_database_fields(self):
+        queryset = self.search("BOB", fields=["username"])
+        self.assertEqual(self.usernames(queryset), ["bob"])
+        self.assertFalse(queryset.query.distinct)
+        self.assertEqual(
+            self.usernames(self.search("bob", fields=["username", "last_name"])),
+            ["bob", "carol"],
+        )
+        queryset = self.search("admin", fields=["groups__name"])
+        self.assertTrue(queryset.query.distinct)
+        self.assertEqual(self.usernames(queryset), ["bob"])
+
+    def test_haystack(self):
+        # the model is not indexed, the database is searched
+        self.assertEqual(
+            self.usernames(self.search("bob", "haystack")), ["bob", "carol"]
+        )
+
+        unified_index = haystack_connections["default"].get_unified_index()
+        unified_index.build(indexes=[UserIndex()])
+        self.addCleanup(unified_index.build)
+        self.addCleanup(unified_index.reset)
+        # the simple engine searches the model fields, but not the relationships
+        self.assertEqual(self.usernames(self.search("admin")), ["bob"])
+        self.assertEqual(self.usernames(self.search("admin", "haystack")), [])
+        self.assertEqual(
+            self.usernames(self.search("bob", "haystack")), ["bob", "carol"]
+        )
+        with self.settings(BASXBREAD_SEARCH_RESULTS_LIMIT=1):
+            self.assertEqual(len(self.search("bob", "haystack")), 1)
+
+    def test_postgresql(self):
+        # other databases fall back to the database backend
+        self.assertEqual(
+            self.usernames(self.search("bob", "postgresql")), ["bob", "carol"]
+        )
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            queryset = self.search("bob", "postgresql", fields=["username", "email"])
+        annotation = queryset.query.annotations["_search"]
+        self.assertIsInstance(annotation, SearchVector)
+        self.assertIn("auth.User.username", repr(annotation))
+        self.assertIn("auth.User.email", repr(annotation))
+        self.assertNotIn("auth.User.first_name", repr(annotation))
+
+    def test_browseview_search_fields(self):
+        request = RequestFactory().get("/", {"q": "bob"})
+        request.user = User.objects.create(username="admin", is_superuser=True)
+        request.session = {}
+        view = views.BrowseView._with(model=User, search_fields=["username"])()
+        view.setup(request)
+        self.assertEqual(self.usernames(view.get_final_queryset()), ["bob"])
@@ -0,0 +1,263 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..contrib.reports.models import Report
+from ..contrib.triggers import registry
+from ..contrib.triggers.apps import periodic_trigger
+from ..contrib.triggers.models import DataChangeTrigger, DateFieldTrigger, SendEmail
+from ..contrib.triggers.tasks import run_action_batch
+
+
+class TriggerRegistryTest(TestCase):
+    def setUp(self):
+        registry.invalidate()
+        self.action = SendEmail.objects.create(
+            description="action",
+            model=ContentType.objects.get_for_model(Group),
+            email="a@example.com",
+            subject="Deleted {{ object.name }}",
+            message="",
+        )
+
+    def test_no_queries_without_triggers(self):
+        registry.get_triggers(Group, "added")
+        with self.assertNumQueries(1):
+            group = Group.objects.create(name="group")
+        with self.assertNumQueries(0):
+            registry.get_triggers(Group, "deleted")
+            registry.get_triggers(Group, "changed")
+        self.assertEqual(registry.get_triggers(Group, "deleted"), ())
+        group.delete()
+
+    def test_invalidation(self):
+        registry.get_triggers(Group, "deleted")
+        trigger = DataChangeTrigger.objects.create(
+            description="trigger",
+            model=ContentType.objects.get_for_model(Group),
+            type="deleted",
+            filter='name = "match"',
+            action=self.action,
+        )
+        self.assertEqual(len(registry.get_triggers(Group, "deleted")), 1)
+
+        Group.objects.create(name="match").delete()
+        Group.objects.create(name="other").delete()
+        self.assertEqual([m.subject for m in mail.outbox], ["Deleted match"])
+
+        trigger.enable = False
+        trigger.save()
+        self.assertEqual(registry.get_triggers(Group, "deleted"), ())
+        Group.objects.create(name="match").delete()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_invalidation_in_other_processes(self):
+        self.assertEqual(registry.get_triggers(Group, "deleted"), ())
+        # the other process only sees the new version in the cache
+        with mock.patch.object(registry, "invalidate"):
+            DataChangeTrigger.objects.create(
+                description="trigger",
+                model=ContentType.objects.get_for_model(Group),
+                type="deleted",
+                action=self.action,
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual(len(registry.get_triggers(Group, "deleted")), 1)
+        with self.assertNumQueries(0):
+            registry.get_triggers(Group, "deleted")
+
+        with mock.patch.object(registry, "invalidate"):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                DataChangeTrigger.objects.update(enable=False)
+                self.action.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(registry.get_triggers(Group, "deleted"), ())
+
+        cache.clear()  # e.g. an evicted version
+        DataChangeTrigger.objects.update(enable=True)
+        self.assertEqual(len(registry.get_triggers(Group, "deleted")), 1)
+
+    def test_old_object_only_for_watched_fields(self):
+        user = User.objects.create(username="user")
+        registry.get_triggers(User, "changed")
+        with self.assertNumQueries(1):
+            user.save()
+
+        DataChangeTrigger.objects.create(
+            description="trigger",
+            model=ContentType.objects.get_for_model(User),
+            type="changed",
+            field="email",
+        )
+        registry.get_triggers(User, "changed")
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertEqual(len(queries), 2)
+        self.assertIn("email", queries[0]["sql"])
+        self.assertNotIn("password", queries[0]["sql"])
+
+    def test_suspend_triggers(self):
+        DataChangeTrigger.objects.create(
+            description="trigger",
+            model=ContentType.objects.get_for_model(Group),
+            type="deleted",
+            action=self.action,
+        )
+        with registry.suspend_triggers():
+            Group.objects.create(name="group").delete()
+        self.assertEqual(len(mail.outbox), 0)
+        Group.objects.create(name="group").delete()
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class DateFieldTriggerTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        usercontenttype = ContentType.objects.get_for_model(User)
+        users = User.objects.bulk_create(
+            User(
+                username=f"user{i}",
+                date_joined=self.now
+                + datetime.timedelta(hours=i * 5 - 3000, minutes=17),
+            )
+            for i in range(1000)
+        )
+        report = Report.objects.create(name="report", model=usercontenttype)
+        Report.objects.bulk_create(
+            Report(name=f"report{i}", model=usercontenttype) for i in range(400)
+        )
+        for i, pk in enumerate(Report.objects.values_list("pk", flat=True)):
+            Report.objects.filter(pk=pk).update(
+                created=timezone.localdate(self.now) + datetime.timedelta(days=i - 200)
+            )
+        self.contenttypes = {
+            "date_joined": usercontenttype,
+            "created": ContentType.objects.get_for_model(report),
+        }
+        self.assertEqual(len(users), 1000)
+
+    def test_due_queryset(self):
+        period = datetime.timedelta(hours=1)
+        midnight = timezone.make_aware(
+            datetime.datetime.combine(
+                timezone.localdate(self.now) + datetime.timedelta(days=1),
+                datetime.time(),
+            )
+        )
+        found = set()
+        for field in ("date_joined", "created"):
+            for ignore_year in (False, True):
+                for offset_type, offset_amount in (
+                    ("days", 0),
+                    ("hours", 5),
+                    ("days", -3),
+                    ("weeks", 2),
+                    ("months", -1),
+                ):
+                    trigger = DateFieldTrigger(
+                        description="trigger",
+                        model=self.contenttypes[field],
+                        field=field,
+                        ignore_year=ignore_year,
+                        offset_type=offset_type,
+                        offset_amount=offset_amount,
+                    )
+                    for start in (
+                        self.now,
+                        self.now + datetime.timedelta(hours=10),
+                        midnight - datetime.timedelta(minutes=10),
+                        timezone.make_aware(datetime.datetime(2024, 12, 31, 23, 30)),
+                    ):
+                        end = start + period
+
+                        def due(instances):
+                            return {
+                                instance.pk
+                                for instance in instances
+                                for td in trigger.triggerdates(instance)
+                                if td is not None and start <= td < end
+                            }
+
+                        queryset = trigger.due_queryset(start, end)
+                        result = due(queryset.iterator())
+                        found.add((field, ignore_year, bool(result)))
+                        self.assertEqual(
+                            result,
+                            due(trigger.filter.queryset.all()),
+                            (field, ignore_year, offset_type, offset_amount, start),
+                        )
+                        self.assertLess(queryset.count(), 30)
+        # make sure the cases are not trivial
+        self.assertIn(("date_joined", False, True), found)
+        self.assertIn(("date_joined", True, True), found)
+        self.assertIn(("created", False, True), found)
+        self.assertIn(("created", True, True), found)
+
+    def test_periodic_trigger_batches(self):
+        action = SendEmail.objects.create(
+            description="action",
+            model=self.contenttypes["date_joined"],
+            email="a@example.com",
+            subject="{{ object.username }}",
+            message="",
+        )
+        DateFieldTrigger.objects.create(
+            description="trigger",
+            model=self.contenttypes["date_joined"],
+            field="date_joined",
+            offset_type="days",
+            offset_amount=-1,
+            action=action,
+        )
+        User.objects.update(
+            date_joined=self.now + datetime.timedelta(days=1, minutes=1)
+        )
+        with mock.patch("basxbread.contrib.triggers.apps.TRIGGER_BATCH_SIZE", 300):
+            with mock.patch.object(run_action_batch, "apply_async") as apply_async:
+                periodic_trigger()
+        batches = [call.args[0] for call in apply_async.call_args_list]
+        self.assertEqual([len(batch[2]) for batch in batches], [300, 300, 300, 100])
+
+        with self.assertNumQueries(3):  # action, concrete action, objects
+            run_action_batch(*batches[-1])
+        self.assertEqual(len(mail.outbox), 100)
+
+    def test_send_email_batch(self):
+        group = Group.objects.create(name="team")
+        group.user_set.add(
+            *User.objects.filter(username__in=["user1", "user2"]).order_by("pk")
+        )
+        User.objects.filter(username="user1").update(email="user1@example.com")
+        User.objects.filter(username="user2").update(email="user2@example.com")
+        User.objects.filter(username="user3").update(email="user3@example.com")
+        action = SendEmail.objects.create(
+            description="action",
+            model=self.contenttypes["date_joined"],
+            email="@team, object.email",
+            subject="Hello {{ object.username }}",
+            message="",
+        )
+        users = list(User.objects.order_by("pk")[:20])
+        with mock.patch(
+            "basxbread.contrib.triggers.models.get_connection",
+            wraps=get_connection,
+        ) as connection:
+            # user and group lookup, group members
+            with self.assertNumQueries(3):
+                self.assertEqual(action.run_batch(users), [])
+        connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 20)
+        self.assertEqual(
+            mail.outbox[3].to,
+            ["user1@example.com", "user2@example.com", "user3@example.com"],
+        )
+        self.assertEqual(mail.outbox[3].subject, "Hello user3")
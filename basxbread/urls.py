@@ -5,7 +5,7 @@ from django.contrib.auth.views import LogoutView
 from django.urls import include, path
 
 from .utils import autopath, default_model_paths
-from .views import administration, auth, datamodel, userprofile, users
+from .views import administration, auth, browse, datamodel, userprofile, users
 from .views.globalpreferences import PreferencesView
 
 urlpatterns = [
@@ -95,6 +95,7 @@ urlpatterns = [
         editview=users.GroupEditView,
     ),
     autopath(datamodel.datamodel, urlname="datamodel"),
+    autopath(browse.export_download, urlname="exportdownload"),
 ]
 
 for app in apps.get_app_configs():
@@ -1,11 +1,31 @@
+import csv
 import html
 import io
+import json
 import re
+import tempfile
 
 import htmlgenerator as hg
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.utils.html import strip_tags
 
+# replace HTML line breaks with newlines
+NEWLINE_REGEX = re.compile(r"<\s*br\s*/?\s*>")
+
+
+def excel_header(columnname):
+    return html.unescape(strip_tags(NEWLINE_REGEX.sub(r"\n", str(columnname))))
+
+
+def excel_cellvalue(value, request=None):
+    if isinstance(value, hg.BaseElement):
+        value = hg.render(value, {"request": request})
+    return html.unescape(
+        strip_tags(NEWLINE_REGEX.sub(r"\n", str(value or "")))
+        .replace("\n\n", "\n")
+        .strip()
+    )
+
 
 def generate_excel(rows, columns, request=None):
     """
@@ -18,28 +38,169 @@ def generate_excel(rows, columns, request=None):
     workbookcolumns = workbook.active.iter_cols(
         min_row=1, max_col=len(columns) + 1, max_row=len(rows) + 1
     )
-    newline_regex = re.compile(
-        r"<\s*br\s*/?\s*>"
-    )  # replace HTML line breaks with newlines
     for columnname, columndata in zip(columns, workbookcolumns):
-        columndata[0].value = html.unescape(
-            strip_tags(newline_regex.sub(r"\n", str(columnname)))
-        )
+        columndata[0].value = excel_header(columnname)
         columndata[0].font = Font(bold=True)
         for i, cell in enumerate(columndata[1:]):
-            value = columns[columnname](rows[i])
-            if isinstance(value, hg.BaseElement):
-                value = hg.render(value, {"request": request})
-
-            cleaned = html.unescape(
-                strip_tags(newline_regex.sub(r"\n", str(value or "")))
-                .replace("\n\n", "\n")
-                .strip()
-            )
-            cell.value = cleaned
+            cell.value = excel_cellvalue(columns[columnname](rows[i]), request)
     return workbook
 
 
+def generate_excel_streaming(
+    rows,
+    columns,
+    filters=True,
+    request=None,
+    chunk_size=2000,
+    width_sample_size=200,
+):
+    """
+    Same as generate_excel combined with prepare_excel but with constant memory
+    usage: A write-only workbook is filled row by row and written to a temporary
+    file. If rows is a queryset it will be iterated in chunks of chunk_size.
+    Column widths are estimated from the first width_sample_size rows.
+
+        columns: dict with {<columnname>: formatting_function(row)}
+        returns: temporary file with the xlsx content, positioned at the start
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.utils import get_column_letter
+
+    rows = _iterate_rows(rows, chunk_size)
+    formatters = list(columns.values())
+
+    def excelrow(row):
+        return [excel_cellvalue(formatter(row), request) for formatter in formatters]
+
+    headers = [excel_header(columnname) for columnname in columns]
+    sample = []
+    for row in rows:
+        sample.append(excelrow(row))
+        if len(sample) >= width_sample_size:
+            break
+
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    for i, header in enumerate(headers):
+        max_length = max(len(value) for value in [header] + [r[i] for r in sample])
+        worksheet.column_dimensions[get_column_letter(i + 1)].width = min(
+            [(max_length + 3) * 1.2, 50]
+        )
+    if filters is True and headers:
+        worksheet.auto_filter.ref = f"A1:{get_column_letter(len(headers))}1"
+
+    alignment = Alignment(wrap_text=True)
+
+    def writeonlycell(value, bold=False):
+        cell = WriteOnlyCell(worksheet, value=int(value) if value.isdigit() else value)
+        cell.alignment = alignment
+        if bold:
+            cell.font = Font(bold=True)
+        return cell
+
+    worksheet.append([writeonlycell(header, bold=True) for header in headers])
+    for values in sample:
+        worksheet.append([writeonlycell(value) for value in values])
+    for row in rows:
+        worksheet.append([writeonlycell(value) for value in excelrow(row)])
+
+    file = tempfile.TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+
+def _iterate_rows(rows, chunk_size):
+    if hasattr(rows, "iterator"):
+        return rows.iterator(chunk_size=chunk_size)
+    return iter(rows)
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer, returns the written line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def generate_csv(rows, columns, request=None, chunk_size=2000):
+    """
+    Generator which yields the rows as lines of a CSV file, starting with the header.
+    If rows is a queryset it will be iterated in chunks of chunk_size.
+
+        columns: dict with {<columnname>: formatting_function(row)}
+    """
+    writer = csv.writer(_Echo())
+    formatters = list(columns.values())
+    yield writer.writerow([excel_header(columnname) for columnname in columns])
+    for row in _iterate_rows(rows, chunk_size):
+        yield writer.writerow(
+            [excel_cellvalue(formatter(row), request) for formatter in formatters]
+        )
+
+
+def generate_jsonlines(rows, columns, request=None, chunk_size=2000):
+    """
+    Generator which yields the rows as JSON objects, one per line (NDJSON).
+    If rows is a queryset it will be iterated in chunks of chunk_size.
+
+        columns: dict with {<columnname>: formatting_function(row)}
+    """
+    headers = [excel_header(columnname) for columnname in columns]
+    formatters = list(columns.values())
+    for row in _iterate_rows(rows, chunk_size):
+        yield json.dumps(
+            {
+                header: excel_cellvalue(formatter(row), request)
+                for header, formatter in zip(headers, formatters)
+            },
+            ensure_ascii=False,
+        ) + "\n"
+
+
+def spooled_lines(lines):
+    """
+    Writes lines of text into a temporary file, e.g. the output of generate_csv
+
+        returns: temporary file with the utf-8 encoded content, positioned at the start
+    """
+    file = tempfile.TemporaryFile()
+    for line in lines:
+        file.write(line.encode("utf-8"))
+    file.seek(0)
+    return file
+
+
+def csvresponse(lines, title):
+    """
+    Returns the lines generated by generate_csv as a streamed download
+
+        lines: iterable of CSV lines
+        title: filename without extension
+        returns: StreamingHttpResponse with attachment
+    """
+    response = StreamingHttpResponse(lines, content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{title}.csv"'
+    return response
+
+
+def jsonlinesresponse(lines, title):
+    """
+    Returns the lines generated by generate_jsonlines as a streamed download
+
+        lines: iterable of JSON lines
+        title: filename without extension
+        returns: StreamingHttpResponse with attachment
+    """
+    response = StreamingHttpResponse(
+        lines, content_type="application/x-ndjson; charset=utf-8"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{title}.jsonl"'
+    return response
+
+
 def xlsxresponse(workbook, title, filters=True):
     """
     Returns workbook as a downloadable file
@@ -57,6 +218,23 @@ def xlsxresponse(workbook, title, filters=True):
     return response
 
 
+def xlsxstreamingresponse(file, title):
+    """
+    Returns a file generated by generate_excel_streaming as a download
+    which is streamed to the client in blocks
+
+        file: file-like object with the xlsx content
+        title: filename without extension
+        returns: FileResponse with attachment
+    """
+    return FileResponse(
+        file,
+        as_attachment=True,
+        filename=f"{title}.xlsx",
+        content_type="application/vnd.ms-excel",
+    )
+
+
 def prepare_excel(workbook, filters=True):
     """
     Formats the excel a bit in order to be displayed nicely
@@ -1,10 +1,24 @@
+import functools
+
+from django.conf import settings
 from django.utils import formats
 from django.utils.formats import localize
 from django.utils.timezone import now
 from jinja2.sandbox import SandboxedEnvironment
 
+# number of compiled templates which are kept in memory
+JINJA_TEMPLATE_CACHE_SIZE = getattr(
+    settings, "BASXBREAD_JINJA_TEMPLATE_CACHE_SIZE", 512
+)
+# longer template sources are compiled on every use instead of being cached
+JINJA_TEMPLATE_CACHE_MAX_LENGTH = getattr(
+    settings, "BASXBREAD_JINJA_TEMPLATE_CACHE_MAX_LENGTH", 64 * 1024
+)
+
 
+@functools.lru_cache(maxsize=None)
 def jinja_env():
+    """Returns the shared sandboxed environment, it must not be modified"""
     environment = SandboxedEnvironment()
     environment.filters["map"] = lambda value, map: map.get(value, value)
     environment.filters["localize"] = localize
@@ -14,5 +28,26 @@ def jinja_env():
     return environment
 
 
+def jinja_template(source, cache_large=False):
+    """
+    Returns the compiled template for the source text, cached if possible.
+    With cache_large, sources over JINJA_TEMPLATE_CACHE_MAX_LENGTH are cached
+    too, for templates which are rendered many times in a row.
+    """
+    if len(source) > JINJA_TEMPLATE_CACHE_MAX_LENGTH and not cache_large:
+        return jinja_env().from_string(source)
+    return _compiled_template(source)
+
+
 def jinja_render(template, **kwargs):
-    return jinja_env().from_string(template).render(**kwargs)
+    return jinja_template(template).render(**kwargs)
+
+
+def jinja_cache_info():
+    """Hits, misses, maximum and current size of the compiled template cache"""
+    return _compiled_template.cache_info()
+
+
+@functools.lru_cache(maxsize=JINJA_TEMPLATE_CACHE_SIZE)
+def _compiled_template(source):
+    return jinja_env().from_string(source)
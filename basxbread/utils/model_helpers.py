@@ -1,7 +1,10 @@
+import contextlib
 import itertools
+import time
 
 from django.core.exceptions import FieldDoesNotExist
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.constants import LOOKUP_SEP
 from django.db.models.fields import Field
 
 
@@ -81,6 +84,59 @@ def resolve_modellookup(model, accessor):
     return attribchain
 
 
+def related_lookups(model, accessors):
+    """
+    Takes a model and a list of accessor strings like 'address.street' and returns
+    a tuple (select_related, prefetch_related) with the lookups which are necessary
+    to access the values of all accessors without an additional query per object.
+    Single-valued relationships (foreign keys and one-to-one) are joined, as soon
+    as a multi-valued relationship is involved the rest of the path is prefetched.
+    """
+    from django.contrib.contenttypes.fields import GenericForeignKey
+
+    select_related = set()
+    prefetch_related = set()
+    for accessor in accessors:
+        try:
+            chain = resolve_modellookup(model, accessor)
+        except (AttributeError, FieldDoesNotExist):
+            continue
+        selectpath = []
+        prefetchpath = []
+        multivalued = False
+        for field in chain:
+            if isinstance(field, GenericForeignKey):
+                prefetchpath.append(field.name)
+                multivalued = True
+                break
+            if (
+                not isinstance(field, (Field, models.ForeignObjectRel))
+                or not field.is_relation
+            ):
+                break
+            if not multivalued:
+                selectpath.append(field.name)
+            if isinstance(field, models.ForeignObjectRel):
+                prefetchpath.append(field.get_accessor_name())
+            else:
+                prefetchpath.append(field.name)
+            if not multivalued and (field.many_to_many or field.one_to_many):
+                multivalued = True
+                # the single-valued part in front can still be joined
+                selectpath = selectpath[:-1]
+        if multivalued:
+            prefetch_related.add(LOOKUP_SEP.join(prefetchpath))
+        if selectpath:
+            select_related.add(LOOKUP_SEP.join(selectpath))
+    # joining 'a__b' does already join 'a'
+    select_related = {
+        lookup
+        for lookup in select_related
+        if not any(other.startswith(lookup + LOOKUP_SEP) for other in select_related)
+    }
+    return sorted(select_related), sorted(prefetch_related)
+
+
 def filter_fieldlist(model, fieldlist, for_form=False):
     if fieldlist is None:
         fieldlist = ["__all__"]
@@ -190,6 +246,35 @@ def _can_use_in_form(model, field):
     )
 
 
+@contextlib.contextmanager
+def statement_timeout(seconds, using="default"):
+    """
+    Queries inside the context which run longer than the given number of seconds
+    are aborted with a database error. Supported on PostgreSQL (the context is
+    a transaction then) and SQLite, on other databases this does nothing.
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SET LOCAL statement_timeout = {max(int(seconds * 1000), 1)}"
+                )
+            yield
+    elif connection.vendor == "sqlite":
+        connection.ensure_connection()
+        deadline = time.monotonic() + seconds
+        connection.connection.set_progress_handler(
+            lambda: time.monotonic() > deadline, 10000
+        )
+        try:
+            yield
+        finally:
+            connection.connection.set_progress_handler(None, 0)
+    else:
+        yield
+
+
 # FIX: this is super slow when used in loops
 def get_concrete_instance(instance):
     """Returns the the most concrete instance of the model-instance"""
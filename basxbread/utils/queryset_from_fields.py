@@ -1,59 +1,61 @@
+import functools
+
 import django_countries
-from django.db import models
+from django.db import connections, models
 from django.db.models import Q
 from django.db.models.constants import LOOKUP_SEP
+from django.utils.translation import get_language, override
 from django_countries.fields import CountryField
 
 
 def get_char_text_qset(fields, searchquery, prefix):
-    char_text_fields = {
-        f
-        for f in fields
-        if isinstance(f, models.fields.CharField)
-        or isinstance(f, models.fields.TextField)
-    }
-
     return {
-        Q(**{prefix + "_".join((f.name, "_contains")): searchquery})
-        for f in char_text_fields
+        Q(**{lookup: searchquery})
+        for lookup in _char_text_lookups(tuple(fields), prefix)
     }
 
 
 def get_country_qset(fields, searchquery, prefix):
-    countries = {name.lower(): code for code, name in django_countries.countries}
-    country_fields = {f for f in fields if isinstance(f, CountryField)}
-
-    if not country_fields:
-        return set()
-
-    match_countries = {
-        country_name for country_name in countries if searchquery in country_name
-    }
-
     return {
-        Q(**{prefix + f.name: countries[key]})
-        for f in country_fields
-        for key in match_countries
+        Q(**{lookup: code})
+        for lookup in _country_lookups(tuple(fields), prefix)
+        for code in _matching_countries(searchquery)
     }
 
 
 def get_field_queryset(fields, searchquery, prefix="", follow_relationships=1):
-    queryset = {
-        *get_char_text_qset(fields, searchquery, prefix),
-        *get_country_qset(fields, searchquery, prefix),
-    }
-
+    """
+    Returns a Q object which matches searchquery in the text and country fields
+    of the given fields and of the related models up to a depth of follow_relationships.
+    The lookups are only determined once per list of fields, prefix and depth.
+    """
+    textlookups, countrylookups = _search_lookups(
+        tuple(fields), prefix, follow_relationships
+    )
     qs = Q()
-    for query in queryset:
-        qs |= query
+    for lookup in textlookups:
+        qs |= Q(**{lookup: searchquery})
+    if countrylookups:
+        countries = _matching_countries(searchquery)
+        for lookup in countrylookups:
+            for code in countries:
+                qs |= Q(**{lookup: code})
+    return qs
+
+
+@functools.lru_cache(maxsize=None)
+def _search_lookups(fields, prefix, follow_relationships):
+    """Returns a tuple (text lookups, country lookups)"""
+    textlookups = list(_char_text_lookups(fields, prefix))
+    countrylookups = list(_country_lookups(fields, prefix))
 
     if follow_relationships > 0:
-        foreignkey_fields = {
+        foreignkey_fields = [
             f
             for f in fields
             if isinstance(f, models.fields.related.ForeignKey)
             or isinstance(f, models.fields.related.ManyToManyField)
-        }
+        ]
         for foreignkey_field in foreignkey_fields:
             # skip fields with a name beginning with '_'
             if foreignkey_field.name[0] == "_":
@@ -65,8 +67,123 @@ def get_field_queryset(fields, searchquery, prefix="", follow_relationships=1):
                 foreign_fields = foreignkey_field._meta.fields
 
             new_prefix = prefix + LOOKUP_SEP.join([foreignkey_field.name, ""])
-            qs |= get_field_queryset(
-                foreign_fields, searchquery, new_prefix, follow_relationships - 1
+            related_textlookups, related_countrylookups = _search_lookups(
+                tuple(foreign_fields), new_prefix, follow_relationships - 1
             )
+            textlookups.extend(related_textlookups)
+            countrylookups.extend(related_countrylookups)
 
-    return qs
+    return tuple(dict.fromkeys(textlookups)), tuple(dict.fromkeys(countrylookups))
+
+
+def _char_text_lookups(fields, prefix):
+    return tuple(
+        prefix + "_".join((f.name, "_contains"))
+        for f in fields
+        if isinstance(f, models.fields.CharField)
+        or isinstance(f, models.fields.TextField)
+    )
+
+
+def _country_lookups(fields, prefix):
+    return tuple(prefix + f.name for f in fields if isinstance(f, CountryField))
+
+
+def _matching_countries(searchquery):
+    countries = _country_index(get_language())
+    return list(
+        dict.fromkeys(
+            code
+            for country_name, code in countries.items()
+            if searchquery in country_name
+        )
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _country_index(language):
+    """Lower-case country names in the given language, mapped to the country code"""
+    with override(language):
+        return {str(name).lower(): code for code, name in django_countries.countries}
+
+
+SEARCH_BACKENDS = ("database", "haystack", "postgresql")
+
+
+def search_queryset(queryset, searchquery, backend="database", fields=None):
+    """
+    Filters the queryset by a plain search query.
+    backend can be one of:
+    - "database": OR of ``contains`` lookups over the fields (the default)
+    - "haystack": search index of the model, falls back to "database" if the
+      model is not indexed
+    - "postgresql": full text search with a tsvector over the fields, falls
+      back to "database" on other databases. If one of the fields is a
+      SearchVectorField it is used directly, which allows to use an index.
+    fields is a list of lookups like "name" or "address__street", by default the
+    text fields of the model and its direct relationships are searched.
+    """
+    if backend not in SEARCH_BACKENDS:
+        raise ValueError(f"Search backend must be one of {SEARCH_BACKENDS}")
+    if backend == "haystack":
+        pks = _haystack_search_pks(queryset.model, searchquery)
+        if pks is not None:
+            return queryset.filter(pk__in=pks)
+    if backend == "postgresql" and connections[queryset.db].vendor == "postgresql":
+        return _postgresql_search(queryset, searchquery, fields)
+
+    if fields is None:
+        # distinct clause might be necessary in other places too to prevent duplicates
+        return queryset.filter(
+            get_field_queryset(
+                [*queryset.model._meta.fields, *queryset.model._meta.many_to_many],
+                searchquery,
+            )
+        ).distinct()
+    qs = Q()
+    for field in fields:
+        qs |= Q(**{f"{field}__icontains": searchquery})
+    queryset = queryset.filter(qs)
+    if any(LOOKUP_SEP in field for field in fields):
+        queryset = queryset.distinct()
+    return queryset
+
+
+def _haystack_search_pks(model, searchquery):
+    """Returns the pks of the search results or None if the model is not indexed"""
+    from django.conf import settings
+    from haystack import connections as haystack_connections
+    from haystack.query import SearchQuerySet
+
+    if (
+        model
+        not in haystack_connections["default"].get_unified_index().get_indexed_models()
+    ):
+        return None
+    limit = getattr(settings, "BASXBREAD_SEARCH_RESULTS_LIMIT", 1000)
+    return [
+        result.pk
+        for result in SearchQuerySet().models(model).auto_query(searchquery)[:limit]
+    ]
+
+
+def _postgresql_search(queryset, searchquery, fields):
+    from django.contrib.postgres.search import (
+        SearchQuery,
+        SearchVector,
+        SearchVectorField,
+    )
+
+    query = SearchQuery(searchquery, search_type="websearch")
+    if fields is None:
+        fields = [
+            f.name
+            for f in queryset.model._meta.fields
+            if isinstance(f, (models.CharField, models.TextField))
+        ]
+    for field in fields:
+        if LOOKUP_SEP not in field and isinstance(
+            queryset.model._meta.get_field(field), SearchVectorField
+        ):
+            return queryset.filter(**{field: query})
+    return queryset.annotate(_search=SearchVector(*fields)).filter(_search=query)
@@ -11,12 +11,14 @@ from django.contrib import messages
 from django.contrib.auth.decorators import user_passes_test
 from django.core import management
 from django.db import connection
+from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
 from .. import layout, utils
 from ..layout.components.button import Button
 from ..layout.components.datatable import DataTable, DataTableColumn
 from ..layout.components.forms import Form, FormField
+from ..tasks import export_browseview
 from ..views import BrowseView
 
 R = layout.grid.Row
@@ -65,9 +67,28 @@ class TaskResultBrowseView(BrowseView):
         "date_created",
         "date_done",
         "status",
+        "result",
         "task_args",
         "task_kwargs",
         "meta",
+        DataTableColumn(
+            _("Download"),
+            hg.If(
+                hg.F(
+                    lambda c: c["row"].task_name == export_browseview.name
+                    and c["row"].status == "SUCCESS"
+                ),
+                hg.A(
+                    _("Download"),
+                    href=hg.F(
+                        lambda c: reverse(
+                            "exportdownload", kwargs={"task_id": c["row"].task_id}
+                        )
+                    ),
+                    onclick="event.stopPropagation()",
+                ),
+            ),
+        ),
     ]
     rowclickaction = BrowseView.gen_rowclickaction("read")
     rowactions = ()
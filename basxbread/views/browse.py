@@ -1,3 +1,6 @@
+import functools
+import json
+import os
 from typing import Callable, Iterable, List, NamedTuple, Optional, Union
 
 import django_filters
@@ -7,14 +10,19 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
-from django.core.exceptions import FieldDoesNotExist
-from django.db import models
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
+from django.core.files.storage import default_storage
+from django.db import connections, models, transaction
 from django.db.models.constants import LOOKUP_SEP
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import redirect
+from django.http import FileResponse, HttpRequest, HttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from django.utils.translation import pgettext_lazy
 from django.views.generic import ListView
+from django.views.generic.list import MultipleObjectMixin
+from django_filters.constants import EMPTY_VALUES
 from djangoql.exceptions import DjangoQLError
 from djangoql.queryset import apply_search
 
@@ -22,13 +30,20 @@ from .. import layout
 from ..utils import (
     Link,
     ModelHref,
+    csvresponse,
     filter_fieldlist,
+    generate_csv,
     generate_excel,
+    generate_excel_streaming,
+    generate_jsonlines,
+    jsonlinesresponse,
     link_with_urlparameters,
     permissionname,
     queryset_from_fields,
+    related_lookups,
     resolve_modellookup,
     xlsxresponse,
+    xlsxstreamingresponse,
 )
 from .util import BaseView
 
@@ -57,9 +72,40 @@ def default_bulkactions(model, columns=["__all__"]):
             "excel",
             label=_("Excel"),
             iconname="download",
-            action=lambda request, qs: export(qs, columns, request=request),
+            action=lambda request, qs: export(
+                qs, columns, request=request, streaming=True
+            ),
+            permissions=[f"{model._meta.app_label}.view_{model._meta.model_name}"],
+        ),
+        BulkAction(
+            "csv",
+            label=_("CSV"),
+            iconname="CSV",
+            action=lambda request, qs: export_csv(qs, columns, request=request),
             permissions=[f"{model._meta.app_label}.view_{model._meta.model_name}"],
         ),
+        BulkAction(
+            "jsonlines",
+            label=_("JSON"),
+            iconname="JSON",
+            action=lambda request, qs: export_jsonlines(qs, columns, request=request),
+            permissions=[f"{model._meta.app_label}.view_{model._meta.model_name}"],
+        ),
+        *(
+            (
+                BulkAction(
+                    "backgroundexport",
+                    label=_("Export in background"),
+                    iconname="time",
+                    action=export_in_background,
+                    permissions=[
+                        f"{model._meta.app_label}.view_{model._meta.model_name}"
+                    ],
+                ),
+            )
+            if getattr(settings, "BASXBREAD_BACKGROUND_EXPORT", False)
+            else ()
+        ),
         BulkAction(
             "delete",
             label=_("Delete"),
@@ -101,6 +147,90 @@ def order_queryset_by_urlparameter(qs, order):
     return qs
 
 
+class BrowseResult:
+    """
+    The result of a BrowseView for the current request. All values are
+    computed lazily and only once, so that the table, the toolbar, the
+    pagination, the settings panel and the bulk actions can share them.
+    """
+
+    def __init__(self, view):
+        self.view = view
+
+    @cached_property
+    def queryset(self):
+        """The filtered and ordered queryset with all objects"""
+        return self.view.get_final_queryset()
+
+    @cached_property
+    def filterset(self):
+        self.queryset  # the filterset is created while filtering
+        if hasattr(self.view, "_filterset"):
+            return self.view._filterset
+        return self.view.filterset_class(self.view.request.GET, queryset=self.queryset)
+
+    @cached_property
+    def _pagination(self):
+        paginate_by = self.view.get_paginate_by(self.queryset)
+        if paginate_by is None:
+            # all objects are shown anyway, the paginator can reuse the result cache
+            paginate_by = len(self.queryset)
+        if paginate_by > 0:
+            paginator, page, page_queryset, is_paginated = self.view.paginate_queryset(
+                self.queryset, paginate_by
+            )
+            return paginator, page, page_queryset
+        return None, None, self.queryset
+
+    @property
+    def paginator(self):
+        return self._pagination[0]
+
+    @property
+    def page(self):
+        return self._pagination[1]
+
+    @property
+    def page_queryset(self):
+        """The objects of the current page"""
+        return self._pagination[2]
+
+    @cached_property
+    def count(self):
+        """The total number of objects over all pages"""
+        if self.paginator is not None:
+            return self.paginator.count
+        return len(self.page_queryset)
+
+    @property
+    def count_is_approximate(self):
+        self.count  # the paginator knows only after counting
+        return getattr(self.paginator, "count_is_approximate", False)
+
+    @cached_property
+    def pagination_config(self):
+        if self.paginator is None:
+            return None
+        return layout.pagination.PaginationConfig(
+            items_per_page_options=self.view.items_per_page_options,
+            page_urlparameter=(
+                self.view.cursor_urlparameter
+                if self.view.keyset_pagination
+                else self.view.page_kwarg
+            ),
+            paginator=self.paginator,
+            itemsperpage_urlparameter=self.view.itemsperpage_urlparameter,
+        )
+
+    def helper_text(self):
+        meta = self.view.model._meta
+        return "{}{} {}".format(
+            "~" if self.count_is_approximate else "",
+            self.count,
+            meta.verbose_name if self.count == 1 else meta.verbose_name_plural,
+        )
+
+
 class BrowseView(BaseView, LoginRequiredMixin, PermissionRequiredMixin, ListView):
     """TODO: documentation"""
 
@@ -135,6 +265,24 @@ class BrowseView(BaseView, LoginRequiredMixin, PermissionRequiredMixin, ListView
     # if set will be used to save the state of the url parameters and restore them on the next call
     viewstate_sessionkey: Optional[str] = None
 
+    # if True, select_related and prefetch_related will be added for the
+    # relationships which are accessed by the columns, see get_related_lookups
+    optimize_related_lookups: bool = True
+
+    # how the plain search (not starting with "=") is done, see
+    # utils.queryset_from_fields.search_queryset, defaults to the setting
+    # BASXBREAD_SEARCH_BACKEND or "database"
+    search_backend: Optional[str] = None
+    # lookups which are searched, e.g. ("name", "address__street")
+    search_fields: Optional[Iterable[str]] = None
+
+    # if True, pages are selected by seeking on the ordering instead of using
+    # OFFSET, see layout.pagination.KeysetPaginator
+    keyset_pagination: bool = False
+    cursor_urlparameter: str = "cursor"
+    # only with keyset_pagination, use an estimate of the database for the total count
+    approximate_count: bool = False
+
     def __init__(self, *args, **kwargs):
         self.orderingurlparameter = (
             kwargs.get("orderingurlparameter") or self.orderingurlparameter
@@ -171,6 +319,20 @@ class BrowseView(BaseView, LoginRequiredMixin, PermissionRequiredMixin, ListView
             kwargs.get("viewstate_sessionkey") or self.viewstate_sessionkey
         )
         self.filterconfig = kwargs.get("filterconfig") or self.filterconfig
+        self.optimize_related_lookups = kwargs.get(
+            "optimize_related_lookups", self.optimize_related_lookups
+        )
+        self.search_backend = (
+            kwargs.get("search_backend")
+            or self.search_backend
+            or getattr(settings, "BASXBREAD_SEARCH_BACKEND", "database")
+        )
+        self.search_fields = kwargs.get("search_fields") or self.search_fields
+        self.keyset_pagination = kwargs.get("keyset_pagination", self.keyset_pagination)
+        self.cursor_urlparameter = (
+            kwargs.get("cursor_urlparameter") or self.cursor_urlparameter
+        )
+        self.approximate_count = kwargs.get("approximate_count", self.approximate_count)
         self.filterset_class = self.filterset_class or parse_filterconfig(
             self.model,
             self.filterconfig
@@ -192,13 +354,19 @@ class BrowseView(BaseView, LoginRequiredMixin, PermissionRequiredMixin, ListView
         )
 
     def get_layout(self):
+        # all request-specific values are resolved lazily via the "view" in the
+        # render context, so that the layout can be cached if cache_layout is True
+        bulkaction_urlparameter = self.bulkaction_urlparameter
+
         # re-mapping the Links because the URL is not supposed to be a real URL but an identifier
         # for the bulk action
         # TODO: This is a bit ugly but we can reuse the Link type for icon, label and permissions
         bulkactions = [
             Link(
-                link_with_urlparameters(
-                    self.request, **{self.bulkaction_urlparameter: action.name}
+                hg.F(
+                    lambda c, name=action.name: link_with_urlparameters(
+                        c["request"], **{bulkaction_urlparameter: name}
+                    )
                 ),
                 label=action.label,
                 iconname=action.iconname,
@@ -206,46 +374,72 @@ class BrowseView(BaseView, LoginRequiredMixin, PermissionRequiredMixin, ListView
             for action in self.bulkactions
             if action.has_permission(self.request)
         ]
-        fullqueryset = self.get_final_queryset()
-        paginate_by = self.get_paginate_by(fullqueryset)
-        if paginate_by is None:
-            paginate_by = fullqueryset.count()
-        paged_qs = (
-            self.paginate_queryset(fullqueryset, paginate_by)[2]
-            if paginate_by > 0
-            else fullqueryset
-        )
 
         return layout.datatable.DataTable.from_queryset(
-            queryset=paged_qs,
+            queryset=hg.F(lambda c: c["view"].get_result().page_queryset),
+            model=self.model,
             columns=self.columns,
             bulkactions=bulkactions,
             rowactions=self.rowactions,
             # rowactions_dropdown=len(self.rowactions) > 2,  # recommendation from carbon design
             rowactions_dropdown=False,  # will not work with submit-actions, which trigger a modal
             rowclickaction=self.rowclickaction,
-            pagination_config=(
-                layout.pagination.PaginationConfig(
-                    items_per_page_options=self.items_per_page_options,
-                    page_urlparameter=self.page_kwarg,
-                    paginator=self.get_paginator(fullqueryset, paginate_by),
-                    itemsperpage_urlparameter=self.itemsperpage_urlparameter,
-                )
-                if paginate_by > 0
-                else None
-            ),
+            pagination_config=hg.F(lambda c: c["view"].get_result().pagination_config),
             checkbox_for_bulkaction_name=self.objectids_urlparameter,
             title=self.title,
-            settingspanel=self.get_settingspanel(),
+            helper_text=hg.F(lambda c: c["view"].get_result().helper_text()),
+            settingspanel=hg.F(lambda c: c["view"].get_settingspanel()),
             backurl=self.backurl,
             primary_button=self.primary_button,
             search_urlparameter=self.search_urlparameter,
+            optimize_related_lookups=False,  # already done in get_final_queryset
             **getattr(self, "datatable_kwargs", {}),
         )
 
-    def get_context_data(self, *args, **kwargs):
+    def get_layout_cache_key(self):
+        return (
+            *super().get_layout_cache_key(),
+            tuple(
+                action.name
+                for action in self.bulkactions
+                if action.has_permission(self.request)
+            ),
+        )
+
+    def get_result(self):
+        """Returns the BrowseResult for the current request"""
+        if not hasattr(self, "_result"):
+            self._result = BrowseResult(self)
+        return self._result
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.keyset_pagination:
+            paginator = layout.pagination.KeysetPaginator(
+                queryset,
+                page_size,
+                cursor=self.request.GET.get(self.cursor_urlparameter),
+                approximate_count=self.approximate_count,
+            )
+            page = paginator.current_page
+            return (paginator, page, page.object_list, page.has_other_pages())
+        return super().paginate_queryset(queryset, page_size)
+
+    def get_context_data(self, **kwargs):
+        # the pagination of MultipleObjectMixin is skipped, because it would
+        # paginate the unfiltered queryset again
+        result = self.get_result()
+        context = {
+            "paginator": result.paginator,
+            "page_obj": result.page,
+            "is_paginated": result.paginator is not None,
+            "object_list": result.page_queryset,
+        }
+        context_object_name = self.get_context_object_name(result.page_queryset)
+        if context_object_name:
+            context[context_object_name] = result.page_queryset
+        context.update(kwargs)
         return {
-            **super().get_context_data(*args, **kwargs),
+            **super(MultipleObjectMixin, self).get_context_data(**context),
             "layout": self._get_layout_cached(),
             "pagetitle": (
                 self.model._meta.verbose_name_plural
@@ -265,7 +459,7 @@ class BrowseView(BaseView, LoginRequiredMixin, PermissionRequiredMixin, ListView
         ExistingParamsForm = type("ExistingParamsForm", (forms.Form,), existing_params)
 
         return build_filterpanel(
-            self.filterset_class(self.request.GET, queryset=self.get_final_queryset()),
+            self.get_result().filterset,
             ExistingParamsForm(self.request.GET),
         )
 
@@ -294,7 +488,7 @@ class BrowseView(BaseView, LoginRequiredMixin, PermissionRequiredMixin, ListView
                 )
             else:
                 ret = bulkactions[self.request.GET[self.bulkaction_urlparameter]](
-                    self.request, self.get_final_queryset()
+                    self.request, self.get_result().queryset
                 )
                 params = self.request.GET.copy()
                 del params[self.bulkaction_urlparameter]
@@ -341,18 +535,18 @@ class BrowseView(BaseView, LoginRequiredMixin, PermissionRequiredMixin, ListView
                     )
 
             else:
-                # distinct clause might be necessary in other places too to prevent duplicates
-                qs = qs.filter(
-                    queryset_from_fields.get_field_queryset(
-                        [*self.model._meta.fields, *self.model._meta.many_to_many],
-                        searchquery,
-                    )
-                ).distinct()
+                qs = queryset_from_fields.search_queryset(
+                    qs,
+                    searchquery,
+                    backend=self.search_backend,
+                    fields=self.search_fields,
+                )
         return qs
 
     def filter_queryset_by_formfilter(self, qs):
-        filterset = self.filterset_class(self.request.GET, queryset=qs)
-        return filterset.qs
+        # keep the filterset, it is reused for the settings panel
+        self._filterset = self.filterset_class(self.request.GET, queryset=qs)
+        return self._filterset.qs
 
     def filter_queryset_by_selection(self, qs):
         selectedobjects = self.request.GET.getlist(self.objectids_urlparameter)
@@ -372,11 +566,38 @@ class BrowseView(BaseView, LoginRequiredMixin, PermissionRequiredMixin, ListView
             qs, self.request.GET.get(self.orderingurlparameter)
         )
 
+    def get_related_lookups(self):
+        """Returns a tuple (select_related, prefetch_related) with the lookups which
+        will be applied to the queryset. By default these are determined from the
+        relationships which are accessed by the columns. Override to customize."""
+        return related_lookups(
+            self.model,
+            [
+                accessor
+                for accessor in (
+                    layout.datatable.column_accessor(column) for column in self.columns
+                )
+                if accessor
+            ],
+        )
+
+    def get_optimized_queryset(self, qs):
+        if not self.optimize_related_lookups:
+            return qs
+        select_related, prefetch_related = self.get_related_lookups()
+        if select_related:
+            qs = qs.select_related(*select_related)
+        if prefetch_related:
+            qs = qs.prefetch_related(*prefetch_related)
+        return qs
+
     def get_final_queryset(self):
         # use this instead of get_queryset so we get the correct queryset when subclassing
         if not hasattr(self, "_final_queryset"):
-            self._final_queryset = self.get_ordred_queryset(
-                self.get_filtered_queryset(self.get_queryset())
+            self._final_queryset = self.get_optimized_queryset(
+                self.get_ordred_queryset(
+                    self.get_filtered_queryset(self.get_queryset())
+                )
             )
         return self._final_queryset
 
@@ -430,8 +651,8 @@ def deletelink(return_to_current=True, **attributes):
     )
 
 
-# helper function to export a queryset to excel
-def export(queryset, columns, request=None):
+def export_columndefinitions(queryset, columns, request=None):
+    """Returns a dict {<rendered header>: formatting_function(row)} for the given columns"""
     if "__all__" in columns:
         columns = filter_fieldlist(queryset.model, columns)
     columndefinitions = {}
@@ -458,44 +679,153 @@ def export(queryset, columns, request=None):
         ] = lambda row, column=column: hg.render(
             hg.BaseElement(column.cell), {"row": row, "request": request}
         )
+    return columndefinitions
+
+
+# helper function to export a queryset to excel
+def export(queryset, columns, request=None, streaming=False):
+    """
+    streaming: If True the rows are fetched in chunks and written into a write-only
+               workbook which is streamed to the client, this keeps memory usage
+               constant for large querysets
+    """
+    columndefinitions = export_columndefinitions(queryset, columns, request)
+    title = queryset.model._meta.verbose_name
+    if streaming:
+        return xlsxstreamingresponse(
+            generate_excel_streaming(queryset, columndefinitions, request=request),
+            title,
+        )
 
     workbook = generate_excel(queryset, columndefinitions, request=request)
-    workbook.title = queryset.model._meta.verbose_name
+    workbook.title = title
     return xlsxresponse(workbook, workbook.title)
 
 
-def delete(request, queryset, softdeletefield=None, required_permissions=None):
+# helper function to export a queryset to a streamed CSV file
+def export_csv(queryset, columns, request=None):
+    return csvresponse(
+        generate_csv(
+            queryset,
+            export_columndefinitions(queryset, columns, request),
+            request=request,
+        ),
+        queryset.model._meta.verbose_name,
+    )
+
+
+# helper function to export a queryset to a streamed JSON-lines file
+def export_jsonlines(queryset, columns, request=None):
+    return jsonlinesresponse(
+        generate_jsonlines(
+            queryset,
+            export_columndefinitions(queryset, columns, request),
+            request=request,
+        ),
+        queryset.model._meta.verbose_name,
+    )
+
+
+def export_in_background(request, queryset, format="xlsx"):
+    """
+    Bulk action which starts a celery task to export the current view of the
+    table (selection, filters, search and ordering are taken from the URL).
+    The queryset argument is ignored because the task will rebuild it.
+    The file can be downloaded from the background jobs page when the task
+    has finished, users with an email address will be notified.
+    """
+    from kombu.utils.uuid import uuid
+
+    from ..tasks import export_browseview
+
+    task_id = uuid()
+    export_browseview.apply_async(
+        (
+            request.path,
+            request.GET.urlencode(),
+            request.user.pk,
+            format,
+            request.build_absolute_uri(
+                reverse("exportdownload", kwargs={"task_id": task_id})
+            ),
+        ),
+        task_id=task_id,
+    )
+    messages.info(
+        request,
+        _(
+            "The export has been started, the file will be available under "
+            "'Background Jobs' when it is ready"
+        ),
+    )
+
+
+def export_download(request, task_id: str):
+    """Download the file of a finished background export"""
+    from django_celery_results.models import TaskResult
+
+    from ..tasks import export_browseview
+
+    taskresult = get_object_or_404(
+        TaskResult, task_id=task_id, task_name=export_browseview.name, status="SUCCESS"
+    )
+    result = json.loads(taskresult.result)
+    if result["user"] != request.user.pk and not request.user.is_superuser:
+        raise PermissionDenied()
+    return FileResponse(
+        default_storage.open(result["filename"]),
+        as_attachment=True,
+        filename=os.path.basename(result["filename"]),
+    )
+
+
+def delete(
+    request,
+    queryset,
+    softdeletefield=None,
+    required_permissions=None,
+    object_permissions=False,
+    send_signals=False,
+    batch_size=1000,
+):
+    """
+    Deletes all objects of the queryset, or sets softdeletefield to True.
+    The permissions are checked once on the model level. If object_permissions
+    is True, users without model permissions can still delete the objects for
+    which they have object permissions. A soft delete is a single UPDATE,
+    unless send_signals is True, then every object is saved. A hard delete
+    is done in batches of batch_size inside one transaction, so either all
+    or no objects are deleted.
+    """
     if required_permissions is None:
         required_permissions = [
             f"{queryset.model._meta.app_label}.delete_{queryset.model.__name__.lower()}"
         ]
+    permitted = _permitted_queryset(
+        request, queryset, required_permissions, object_permissions
+    )
+    if permitted is None:
+        messages.error(
+            request,
+            _("Your user has not the permissions to delete %s")
+            % queryset.model._meta.verbose_name_plural,
+        )
+        return
 
-    deleted = 0
-    for instance in queryset:
-        try:
-            if not request.user.has_perms(
-                required_permissions, instance
-            ) and not request.user.has_perms(required_permissions):
-                # we throw an exception here because the user not supposed to
-                # see the option to delete an object anyway, if he does not have the permssions
-                # the queryset should already be filtered
-                raise Exception(
-                    _("Your user has not the permissions to delete %s") % instance
-                )
-            if softdeletefield:
-                if not getattr(instance, softdeletefield):
-                    setattr(instance, softdeletefield, True)
-                    instance.save()
-                    deleted += 1
-            else:
-                instance.delete()
-                deleted += 1
-        except Exception as e:
-            messages.error(
-                request,
-                _("%(object)s could not be deleted: %(error)s")
-                % {"object": object, "error": e},
+    try:
+        if softdeletefield:
+            deleted = _set_softdeletefield(
+                permitted, softdeletefield, True, send_signals
             )
+        else:
+            deleted = _delete_in_batches(permitted, batch_size)
+    except Exception as e:
+        messages.error(
+            request,
+            _("%(object)s could not be deleted: %(error)s")
+            % {"object": queryset.model._meta.verbose_name_plural, "error": e},
+        )
+        return
 
     messages.success(
         request,
@@ -511,32 +841,37 @@ def delete(request, queryset, softdeletefield=None, required_permissions=None):
     )
 
 
-def restore(request, queryset, softdeletefield, required_permissions=None):
+def restore(
+    request,
+    queryset,
+    softdeletefield,
+    required_permissions=None,
+    object_permissions=False,
+    send_signals=False,
+):
+    """Sets softdeletefield to False, see ``delete`` for the arguments"""
     if required_permissions is None:
         required_permissions = [permissionname(queryset.model, "delete")]
-
-    restored = 0
-    for instance in queryset:
-        try:
-            if not request.user.has_perms(
-                required_permissions, instance
-            ) and not request.user.has_perms(required_permissions):
-                # we throw an exception here because the user not supposed to
-                # see the option to restore an object anyway, if he does not have the permssions
-                # the queryset should already be filtered
-                raise Exception(
-                    _("Your user has not the permissions to restore %s") % instance
-                )
-            if getattr(instance, softdeletefield, False):
-                setattr(instance, softdeletefield, False)
-                instance.save()
-                restored += 1
-        except Exception as e:
-            messages.error(
-                request,
-                _("%(object)s could not be restored: %(error)s")
-                % {"object": object, "error": e},
-            )
+    permitted = _permitted_queryset(
+        request, queryset, required_permissions, object_permissions
+    )
+    if permitted is None:
+        messages.error(
+            request,
+            _("Your user has not the permissions to restore %s")
+            % queryset.model._meta.verbose_name_plural,
+        )
+        return
+
+    try:
+        restored = _set_softdeletefield(permitted, softdeletefield, False, send_signals)
+    except Exception as e:
+        messages.error(
+            request,
+            _("%(object)s could not be restored: %(error)s")
+            % {"object": queryset.model._meta.verbose_name_plural, "error": e},
+        )
+        return
 
     messages.success(
         request,
@@ -552,6 +887,56 @@ def restore(request, queryset, softdeletefield, required_permissions=None):
     )
 
 
+def _permitted_queryset(request, queryset, required_permissions, object_permissions):
+    """
+    Returns the objects of the queryset which the user is allowed to change
+    as a new queryset without ordering, joins or distinct, which can be
+    updated and deleted. Returns None if the user has neither the model
+    permissions nor, with object_permissions, the permissions for any object.
+    """
+    base = queryset.model._base_manager
+    if request.user.has_perms(required_permissions):
+        pks = queryset.order_by().values("pk")
+        if not connections[queryset.db].features.update_can_self_select:
+            pks = list(pks)  # e.g. MySQL cannot update a table it selects from
+        return base.filter(pk__in=pks)
+    if object_permissions:
+        pks = [
+            instance.pk
+            for instance in queryset
+            if request.user.has_perms(required_permissions, instance)
+        ]
+        if pks:
+            return base.filter(pk__in=pks)
+    return None
+
+
+def _set_softdeletefield(queryset, softdeletefield, value, send_signals):
+    queryset = queryset.exclude(**{softdeletefield: value})
+    if not send_signals:
+        return queryset.update(**{softdeletefield: value})
+    count = 0
+    with transaction.atomic(using=queryset.db):
+        for instance in queryset.iterator():
+            setattr(instance, softdeletefield, value)
+            instance.save()
+            count += 1
+    return count
+
+
+def _delete_in_batches(queryset, batch_size):
+    model = queryset.model
+    deleted = 0
+    with transaction.atomic(using=queryset.db):
+        pks = list(queryset.values_list("pk", flat=True))
+        for i in range(0, len(pks), batch_size):
+            _, per_model = model._base_manager.filter(
+                pk__in=pks[i : i + batch_size]
+            ).delete()
+            deleted += per_model.get(model._meta.label, 0)
+    return deleted
+
+
 class AndGroup(django_filters.FilterSet):
     prefix = None
 
@@ -562,21 +947,41 @@ class AndGroup(django_filters.FilterSet):
             self.subgroups.append(group(*args, **kwargs))
         self.form_prefix = self.prefix
 
-    def filter_queryset(self, queryset):
-        for name, value in self.form.cleaned_data.items():
-            queryset = self.filters[name].filter(queryset, value)
-            assert isinstance(
-                queryset, models.QuerySet
-            ), "Expected '%s.%s' to return a QuerySet, but got a %s instead." % (
-                type(self).__name__,
-                name,
-                type(queryset).__name__,
+    def get_q(self, queryset):
+        """
+        Returns a tuple (Q or None, distinct, multivalued) for this group and all
+        subgroups, see filter_queryset for conditions on multi-valued relationships
+        """
+        conditions = list(_filtergroup_qs(self, queryset))
+        if not conditions:
+            return None, False, False
+        if sum(multivalued for q, distinct, multivalued in conditions) > 1:
+            return (
+                models.Q(
+                    pk__in=self.filter_queryset(
+                        queryset.model._base_manager.all()
+                    ).values("pk")
+                ),
+                False,
+                False,
             )
+        ret = models.Q()
+        for q, distinct, multivalued in conditions:
+            ret &= q
+        return (
+            ret,
+            any(distinct for q, distinct, multivalued in conditions),
+            any(multivalued for q, distinct, multivalued in conditions),
+        )
 
-        for group in self.subgroups:
-            queryset = group.filter_queryset(queryset)
-
-        return queryset
+    def filter_queryset(self, queryset):
+        # Every condition gets its own filter() call, so that conditions on a
+        # multi-valued relationship may be matched by different related objects.
+        distinct = False
+        for q, needs_distinct, multivalued in _filtergroup_qs(self, queryset):
+            queryset = queryset.filter(q)
+            distinct = distinct or needs_distinct
+        return queryset.distinct() if distinct else queryset
 
     @property
     def errors(self):
@@ -596,26 +1001,20 @@ class OrGroup(django_filters.FilterSet):
             self.subgroups.append(group(*args, **kwargs))
         self.form_prefix = self.prefix
 
+    def get_q(self, queryset):
+        """Returns a tuple (Q or None, distinct, multivalued) for this group and all subgroups"""
+        ret, distinct, multivalued = None, False, False
+        for q, needs_distinct, is_multivalued in _filtergroup_qs(self, queryset):
+            ret = q if ret is None else ret | q
+            distinct = distinct or needs_distinct
+            multivalued = multivalued or is_multivalued
+        return ret, distinct, multivalued
+
     def filter_queryset(self, queryset):
-        if (
-            len([i for i in self.subgroups if i.form.has_changed()]) == 0
-            and len(self.form.cleaned_data) == 0
-        ):
-            return queryset
-        basefilterset = queryset.none()
-        for name, value in self.form.cleaned_data.items():
-            basefilterset |= self.filters[name].filter(queryset, value)
-            assert isinstance(
-                basefilterset, models.QuerySet
-            ), "Expected '%s.%s' to return a QuerySet, but got a %s instead." % (
-                type(self).__name__,
-                name,
-                type(basefilterset).__name__,
-            )
-        for group in self.subgroups:
-            if group.form.has_changed():  # ignore subgroup with no changes
-                basefilterset |= group.filter_queryset(queryset)
-        return basefilterset
+        q, distinct, multivalued = self.get_q(queryset)
+        if q is not None:
+            queryset = queryset.filter(q)
+        return queryset.distinct() if distinct else queryset
 
     @property
     def errors(self):
@@ -625,6 +1024,94 @@ class OrGroup(django_filters.FilterSet):
         return ret
 
 
+def _filtergroup_qs(filterset, queryset):
+    """
+    Yields a tuple (Q, distinct, multivalued) for each field with a value and each
+    subgroup of a filter group, multivalued is True if the condition spans a
+    many-to-many or reverse foreign key relationship. Fields and groups without a
+    value do not filter and are skipped.
+    """
+    for name, value in filterset.form.cleaned_data.items():
+        filter = filterset.filters[name]
+        q = _filter_q(filter, queryset, value)
+        if q is not None:
+            yield q, filter.distinct, _is_multivalued(queryset.model, filter.field_name)
+    for group in filterset.subgroups:
+        q, distinct, multivalued = group.get_q(queryset)
+        if q is not None:
+            yield q, distinct, multivalued
+
+
+def _is_multivalued(model, lookup):
+    for name in lookup.split(LOOKUP_SEP):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        if field.many_to_many or field.one_to_many:
+            return True
+        if not field.is_relation or field.related_model is None:
+            return False
+        model = field.related_model
+    return False
+
+
+def _filter_q(filter, queryset, value):
+    """
+    Returns the condition of a django-filter Filter as Q object or None if the
+    value does not filter. The conditions of the standard filters are built
+    directly, other filters (custom methods or overriden filter()) are
+    wrapped into a subquery.
+    """
+    filtermethod = getattr(filter.filter, "__func__", None)
+    lookup = f"{filter.field_name}__{filter.lookup_expr}"
+    if filtermethod is django_filters.MultipleChoiceFilter.filter:
+        if not value or filter.is_noop(queryset, value):
+            return None
+        if filter.conjoined:
+            # needs a separate join per value
+            return models.Q(
+                pk__in=filter.filter(queryset.model._base_manager.all(), value).values(
+                    "pk"
+                )
+            )
+        q = models.Q()
+        for v in set(value):
+            q |= models.Q(
+                **filter.get_filter_predicate(None if v == filter.null_value else v)
+            )
+    elif filtermethod is django_filters.RangeFilter.filter:
+        if not value:
+            return None
+        if value.start is not None and value.stop is not None:
+            q = models.Q(**{f"{filter.field_name}__range": (value.start, value.stop)})
+        elif value.start is not None:
+            q = models.Q(**{f"{filter.field_name}__gte": value.start})
+        elif value.stop is not None:
+            q = models.Q(**{f"{filter.field_name}__lte": value.stop})
+        else:
+            return None
+    elif filtermethod in (
+        django_filters.Filter.filter,
+        django_filters.ChoiceFilter.filter,
+    ):
+        if value in EMPTY_VALUES:
+            return None
+        if (
+            filtermethod is django_filters.ChoiceFilter.filter
+            and value == filter.null_value
+        ):
+            value = None
+        q = models.Q(**{lookup: value})
+    else:
+        if value in EMPTY_VALUES:
+            return None
+        return models.Q(
+            pk__in=filter.filter(queryset.model._base_manager.all(), value).values("pk")
+        )
+    return ~q if filter.exclude else q
+
+
 def parse_filterconfig(basemodel, filterconfig, prefix):
     """
     filterconfig: Tree in the form of
@@ -632,7 +1119,29 @@ def parse_filterconfig(basemodel, filterconfig, prefix):
                       ("or", fieldname1, fieldname2),
                       ("or", fieldname3, fieldname4),
                   )
+    The generated FilterSet classes are cached per model, filterconfig and prefix.
     """
+    return _parse_filterconfig(basemodel, _normalize_filterconfig(filterconfig), prefix)
+
+
+def _normalize_filterconfig(filterconfig):
+    """Converts the filterconfig into nested tuples so that it can be used as cache key"""
+    grouptype, *subfields = filterconfig
+    ret = [grouptype]
+    for f in subfields:
+        if isinstance(f, str):
+            ret.append(f)
+        elif isinstance(f, Iterable):
+            ret.append(_normalize_filterconfig(f))
+        else:
+            raise ValueError(
+                f"Declared filter field '{f}' is not of type {(str, OrGroup, AndGroup)} but {type(f)}"
+            )
+    return tuple(ret)
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_filterconfig(basemodel, filterconfig, prefix):
     FILTERSETTYPE = {"and": AndGroup, "or": OrGroup}
     grouptype, *subfields = filterconfig
     if grouptype.lower() not in FILTERSETTYPE:
@@ -654,13 +1163,9 @@ def parse_filterconfig(basemodel, filterconfig, prefix):
                 modelfield, (models.FileField, GenericForeignKey, GenericRelation)
             ):
                 fields.append(f)
-        elif isinstance(f, Iterable):
-            subgroups.append(parse_filterconfig(basemodel, f, prefix + str(n)))
-            n += 1
         else:
-            raise ValueError(
-                f"Declared filter field '{f}' is not of type {(str, OrGroup, AndGroup)} but {type(f)}"
-            )
+            subgroups.append(_parse_filterconfig(basemodel, f, prefix + str(n)))
+            n += 1
 
     meta = type(
         "Meta",
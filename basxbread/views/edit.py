@@ -6,6 +6,7 @@ from typing import Iterable, List, Optional, Tuple, Type, Union
 import htmlgenerator as hg
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.db import connections, router, transaction
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 from django.utils.decorators import method_decorator
@@ -89,25 +90,46 @@ def generate_copyview(model, attrs=None, labelfield=None, copy_related_fields=()
     return copy
 
 
-def bulkcopy(request, queryset, attrs=None, labelfield=None, copy_related_fields=()):
+def bulkcopy(
+    request,
+    queryset,
+    attrs=None,
+    labelfield=None,
+    copy_related_fields=(),
+    send_signals=False,
+):
     """creates a copy all instances of a queryset
     attrs: custom field values for the new instance
     labelfield: name of a model field which will be used to create copy-labels
                 (Example, Example (Copy 2), Example (Copy 3), etc)
     copy_related_fields: related fields which should also be (deep) copied
+    send_signals: the copies are inserted with bulk_create, without calling save()
+                  and without signals, unless this is True, then every copy is saved
     """
-    attrs = attrs or {}
-    created = 0
-    errors = 0
-    for instance in queryset:
-        if labelfield:
-            attrs[labelfield] = copylabel(getattr(instance, labelfield))
-        try:
-            deepcopy_object(instance, attrs, copy_related_fields)
-            created += 1
-        except Exception as e:
-            messages.error(request, e)
-            errors += 1
+    try:
+        if send_signals:
+            created = 0
+            for instance in queryset:
+                deepcopy_object(
+                    instance,
+                    {
+                        **(attrs or {}),
+                        **(
+                            {labelfield: copylabel(getattr(instance, labelfield))}
+                            if labelfield
+                            else {}
+                        ),
+                    },
+                    copy_related_fields,
+                )
+                created += 1
+        else:
+            created = len(
+                deepcopy_objects(queryset, attrs, copy_related_fields, labelfield)
+            )
+    except Exception as e:
+        messages.error(request, e)
+        created = 0
     messages.success(request, _("Created %s copies" % created))
     return redirect(request.path)
 
@@ -120,17 +142,20 @@ def deepcopy_object(instance, attrs=None, copy_related_fields=()):
     attrs defineds default values for fields
     """
     oldpk = instance.pk
+    attrs = {k: v() if callable(v) else v for k, v in (attrs or {}).items()}
     # see https://docs.djangoproject.com/en/3.2/topics/db/queries/#copying-model-instances
     many2manyfields = {
-        f.name: getattr(instance, f.name).all()
+        f.name: (
+            attrs.pop(f.name) if f.name in attrs else getattr(instance, f.name).all()
+        )
         for f in instance._meta.get_fields()
         if f.many_to_many
     }
     instance.pk = None
     instance.id = None
     instance._state.adding = True
-    for k, v in (attrs or {}).items():
-        setattr(instance, k, v() if callable(v) else v)
+    for k, v in attrs.items():
+        setattr(instance, k, v)
     instance.save()
     for field, queryset in many2manyfields.items():
         getattr(instance, field).set(queryset)
@@ -149,6 +174,119 @@ def deepcopy_object(instance, attrs=None, copy_related_fields=()):
     return instance
 
 
+def deepcopy_objects(instances, attrs=None, copy_related_fields=(), labelfield=None):
+    """
+    Like deepcopy_object but for many instances of the same model at once.
+    The copies, the related objects of copy_related_fields and the rows of the
+    ManyToMany tables are inserted with bulk_create, so the number of queries does
+    not depend on the number of instances. Like with bulk_create, save() is not
+    called and no signals are sent. Copying happens inside a transaction.
+    """
+    instances = list(instances)
+    if not instances:
+        return []
+    model = type(instances[0])
+    attrs = attrs or {}
+    if (
+        model._meta.parents
+        or not connections[
+            router.db_for_write(model)
+        ].features.can_return_rows_from_bulk_insert
+    ):
+        # bulk_create cannot insert multi-table inherited models or does not
+        # return the new primary keys which are needed for the related objects
+        return [
+            deepcopy_object(
+                instance,
+                {
+                    **attrs,
+                    **(
+                        {labelfield: copylabel(getattr(instance, labelfield))}
+                        if labelfield
+                        else {}
+                    ),
+                },
+                copy_related_fields,
+            )
+            for instance in instances
+        ]
+
+    with transaction.atomic(using=router.db_for_write(model)):
+        copies = _bulk_clone(
+            instances,
+            lambda instance: {
+                **attrs,
+                **(
+                    {labelfield: copylabel(getattr(instance, labelfield))}
+                    if labelfield
+                    else {}
+                ),
+            },
+        )
+        newpks = {instance.pk: copy.pk for instance, copy in zip(instances, copies)}
+        for field in copy_related_fields:
+            foreignkey = model._meta.get_field(field).field
+            related = foreignkey.model._base_manager.filter(
+                **{f"{foreignkey.name}__in": newpks.keys()}
+            ).order_by("pk")
+            _bulk_clone(
+                related,
+                lambda obj: {
+                    foreignkey.attname: newpks[getattr(obj, foreignkey.attname)]
+                },
+            )
+    return copies
+
+
+def _bulk_clone(instances, get_attrs):
+    """Inserts copies of the instances and their ManyToMany relationships"""
+    instances = list(instances)
+    if not instances:
+        return []
+    model = type(instances[0])
+    m2mfields = {f.name: f for f in model._meta.many_to_many}
+    copies = []
+    m2mattrs = []
+    for instance in instances:
+        # raw values from __dict__, because custom descriptors may run queries
+        copy = model(
+            **{
+                f.attname: (
+                    instance.__dict__[f.attname]
+                    if f.attname in instance.__dict__
+                    else getattr(instance, f.attname)
+                )
+                for f in model._meta.concrete_fields
+                if not f.primary_key
+            }
+        )
+        attrs = {k: v() if callable(v) else v for k, v in get_attrs(instance).items()}
+        for k, v in attrs.items():
+            if k not in m2mfields:
+                setattr(copy, k, v)
+        copies.append(copy)
+        m2mattrs.append({k: v for k, v in attrs.items() if k in m2mfields})
+    model._base_manager.bulk_create(copies)
+
+    for copy, attrs in zip(copies, m2mattrs):
+        for k, v in attrs.items():
+            getattr(copy, k).set(v)
+    newpks = {instance.pk: copy.pk for instance, copy in zip(instances, copies)}
+    for m2mfield in m2mfields.values():
+        if m2mfield.name in m2mattrs[0]:
+            continue
+        through = m2mfield.remote_field.through
+        source = through._meta.get_field(m2mfield.m2m_field_name())
+        rows = list(
+            through._base_manager.filter(**{f"{source.attname}__in": newpks.keys()})
+        )
+        for row in rows:
+            row.pk = None
+            setattr(row, source.attname, newpks[getattr(row, source.attname)])
+        through._base_manager.bulk_create(rows)
+    return copies
+
+
 def copylabel(original_name):
     """create names/labels with the sequence (Copy), (Copy 2), (Copy 3), etc."""
     copylabel = pgettext_lazy("this is a copy", "Copy")
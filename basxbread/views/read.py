@@ -64,7 +64,7 @@ class ReadView(
                     style="width: auto",
                 ),
                 _layout.button.Button(_("Edit"), style="margin-top: 2rem").as_href(
-                    ModelHref(self.object, "edit")
+                    ModelHref(hg.C("object"), "edit")
                 ),
             ),
         )
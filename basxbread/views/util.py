@@ -9,6 +9,7 @@ from django.db import models
 from django.http import HttpResponse
 from django.urls import NoReverseMatch
 from django.utils.html import mark_safe
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 
 from .. import layout, menu
@@ -152,6 +153,17 @@ class CustomFormMixin:
                 )
         return form
 
+    def get_layout_cache_key(self):
+        # the number of inline forms depends on the initial values
+        return (
+            *super().get_layout_cache_key(),
+            tuple(
+                (field, len(value))
+                for field, value in self.get_initial().items()
+                if hasattr(value, "__len__")
+            ),
+        )
+
     def get_layout(self):
         if hasattr(self, "layout") and self.layout is not None:
             ret = self.layout
@@ -251,6 +263,11 @@ class BaseView:
 
     layout: typing.Optional[hg.BaseElement] = None
     _layout_cached: typing.Optional[hg.BaseElement] = None
+    # If True, the result of get_layout will be cached on the view class and be
+    # reused for all requests with the same get_layout_cache_key. Only enable if
+    # get_layout does not contain request-specific values which are not lazy.
+    cache_layout: bool = False
+    _class_layout_cache: typing.ClassVar[dict] = {}
     ajax_urlparameter = settings.AJAX_URLPARAMETER
     hidemenus_urlparameter = settings.HIDEMENUS_URLPARAMETER
     page_layout: typing.Optional[
@@ -300,8 +317,34 @@ class BaseView:
 
         return layout.render(self.request, ret, context, **response_kwargs)
 
+    def get_layout_cache_key(self):
+        """Returns a hashable value which identifies the layout returned by
+        get_layout, if ``cache_layout`` is True. Must contain everything the
+        structure of the layout depends on, request-specific values should be
+        resolved lazily via hg.C and hg.F while rendering."""
+        return (
+            # views created with different as_view() kwargs need different layouts
+            getattr(self.request.resolver_match, "func", None),
+            getattr(self, "model", None),
+            get_language(),
+            self.ajax_urlparameter in self.request.GET,
+        )
+
+    @classmethod
+    def invalidate_layout_cache(cls):
+        """Removes the cached layouts of this view class and all its subclasses"""
+        for key in list(BaseView._class_layout_cache.keys()):
+            if issubclass(key[0], cls):
+                BaseView._class_layout_cache.pop(key, None)
+
     def _get_layout_cached(self):
         """Used for caching layouts, only basxbread-internal"""
         if self._layout_cached is None:
-            self._layout_cached = self.get_layout()
+            if self.cache_layout:
+                key = (type(self), self.get_layout_cache_key())
+                if key not in BaseView._class_layout_cache:
+                    BaseView._class_layout_cache[key] = self.get_layout()
+                self._layout_cached = BaseView._class_layout_cache[key]
+            else:
+                self._layout_cached = self.get_layout()
         return self._layout_cached
@@ -0,0 +1,43 @@
+"""
+Requests per second of the user BrowseView (25 of 60 users per page) with and
+without caching of the built layout (BaseView.cache_layout).
+
+    python benchmarks/browse_layout_cache.py [requests]
+"""
+
+import sys
+from unittest import mock
+
+from common import measure, setup
+
+
+def main(requests=50):
+    setup()
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    from basxbread.utils.urls import reverse_model
+    from basxbread.views import BrowseView
+
+    setup_test_environment()
+    User.objects.bulk_create(User(username=f"user{i:02d}") for i in range(60))
+    client = Client()
+    client.force_login(User.objects.create(username="admin", is_superuser=True))
+    url = str(reverse_model(User, "browse"))
+
+    def request():
+        assert client.get(url, {"itemsperpage": 25, "page": 2}).status_code == 200
+
+    for cache_layout in (False, True):
+        with mock.patch.object(BrowseView, "cache_layout", cache_layout):
+            request()  # warm up
+            duration = measure(request, number=requests)
+        print(
+            f"cache_layout={cache_layout}: {1 / duration:.1f} requests/s, "
+            f"{duration * 1000:.1f} ms per request"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,35 @@
+"""
+Helpers for the benchmark scripts in this directory. The scripts run against
+the test settings with a fresh in-memory database, e.g.:
+
+    python benchmarks/datatable_rendering.py
+"""
+
+import os
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "basxbread.tests.settings")
+
+
+def setup():
+    """Sets up django and creates the database tables"""
+    django.setup()
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+
+
+def measure(function, number=1, repeat=3):
+    """Returns the best time in seconds per call of function"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        duration = (time.perf_counter() - start) / number
+        best = duration if best is None else min(best, duration)
+    return best
@@ -0,0 +1,61 @@
+"""
+Rendering time of a DataTable with 1000 rows and 6 model columns, one of them
+through a foreign key, with compiled field accessors and with the generic
+hg.resolve_lookup path of ObjectFieldValue.
+
+    python benchmarks/datatable_rendering.py [rows]
+"""
+
+import sys
+from unittest import mock
+
+from common import measure, setup
+
+
+def main(rows=1000):
+    setup()
+    import htmlgenerator as hg
+    from django.contrib.auth.models import User
+    from django.contrib.contenttypes.models import ContentType
+    from django.test import RequestFactory
+
+    from basxbread import layout
+    from basxbread.contrib.reports.models import Report, ReportColumn
+
+    report = Report.objects.create(
+        name="report", model=ContentType.objects.get_for_model(User)
+    )
+    ReportColumn.objects.bulk_create(
+        ReportColumn(report=report, header=f"header{i}", column="username", _order=i)
+        for i in range(rows)
+    )
+    request = RequestFactory().get("/")
+    request.user = User.objects.create(username="admin", is_superuser=True)
+
+    def render():
+        table = layout.datatable.DataTable.from_queryset(
+            ReportColumn.objects.all(),
+            columns=[
+                "id",
+                "header",
+                "column",
+                "cell_template",
+                "aggregation",
+                "report.name",
+            ],
+            primary_button=hg.BaseElement(),  # ReportColumn has no add view
+        )
+        hg.render(table, {"request": request})
+
+    results = {"compiled": measure(render)}
+    with mock.patch("basxbread.layout.utils.compile_fieldaccessor", return_value=None):
+        results["generic"] = measure(render)
+    for name, duration in results.items():
+        print(
+            f"{name}: {duration * 1000:.0f} ms per table, "
+            f"{duration / rows * 1e6:.0f} us per row"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,76 @@
+"""
+Documents per second when generating a docx document with 1000 paragraphs
+(about 70 KB of document.xml) for each of 1000 users, one document at a
+time and with DocumentTemplate.generate_documents in the current process and
+in a pool of processes (one per CPU).
+
+    python benchmarks/document_generation.py [users] [paragraphs]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import zipfile
+
+from common import measure, setup
+
+
+def main(users=1000, paragraphs=1000):
+    setup()
+    import docx
+    from django.contrib.auth.models import User
+    from django.contrib.contenttypes.models import ContentType
+    from django.core.files.base import ContentFile
+    from django.test import override_settings
+
+    from basxbread.contrib.document_templates.models import DocumentTemplate
+
+    with tempfile.TemporaryDirectory() as mediaroot, override_settings(
+        MEDIA_ROOT=mediaroot
+    ):
+        document = docx.Document()
+        document.sections[0].header.paragraphs[0].text = "To {{ name }}"
+        # word/document.xml is larger than JINJA_TEMPLATE_CACHE_MAX_LENGTH
+        for i in range(paragraphs):
+            document.add_paragraph(f"Line {i} of the letter to {{{{ name }}}}")
+        buf = io.BytesIO()
+        document.save(buf)
+        template = DocumentTemplate(
+            name="letter",
+            model=ContentType.objects.get_for_model(User),
+            filename_template="{{ username }}",
+        )
+        template.file.save("letter.docx", ContentFile(buf.getvalue()), save=False)
+        template.save()
+        template.variables.update_or_create(name="name", defaults={"value": "username"})
+        User.objects.bulk_create(User(username=f"user{i}") for i in range(users))
+        objects = list(User.objects.order_by("pk"))
+        with template.file.open("rb") as f:
+            size = len(zipfile.ZipFile(f).read("word/document.xml"))
+
+        def single():
+            for user in objects:
+                template.generate_document(user, "docx")
+
+        def bulk(processes):
+            def generate():
+                for filename, content in template.generate_documents(
+                    objects, processes
+                ):
+                    pass
+
+            return generate
+
+        results = {"single documents": measure(single, repeat=1)}
+        for processes in sorted({1, os.cpu_count() or 1}):
+            results[f"generate_documents, {processes} processes"] = measure(
+                bulk(processes), repeat=1
+            )
+    print(f"document.xml: {size // 1024} KB")
+    for name, duration in results.items():
+        print(f"{name}: {len(objects) / duration:.0f} documents/s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
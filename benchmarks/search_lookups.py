@@ -0,0 +1,56 @@
+"""
+Time to build the search filter of the user browse view with
+get_field_queryset (all fields of User, following relationships to a depth of
+2, i.e. groups, permissions and their content types) and to match a country
+name with _matching_countries, with and without the cached lookups.
+
+    python benchmarks/search_lookups.py [number]
+"""
+
+import sys
+
+from common import measure, setup
+
+
+def main(number=1000):
+    setup()
+    from django.contrib.auth.models import User
+    from django.utils.translation import override
+
+    from basxbread.utils import queryset_from_fields
+
+    fields = [*User._meta.fields, *User._meta.many_to_many]
+
+    def lookups():
+        queryset_from_fields.get_field_queryset(
+            fields, "germany", follow_relationships=2
+        )
+
+    def countries():
+        queryset_from_fields._matching_countries("germany")
+
+    def uncached(function, cache_clear):
+        def call():
+            cache_clear()
+            function()
+
+        return call
+
+    results = {}
+    with override("en"):
+        results["get_field_queryset, cached"] = measure(lookups, number)
+        results["get_field_queryset, uncached"] = measure(
+            uncached(lookups, queryset_from_fields._search_lookups.cache_clear),
+            number,
+        )
+        results["_matching_countries, cached"] = measure(countries, number)
+        results["_matching_countries, uncached"] = measure(
+            uncached(countries, queryset_from_fields._country_index.cache_clear),
+            number,
+        )
+    for name, duration in results.items():
+        print(f"{name}: {duration * 1e6:.0f} us per call")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))